@@ -0,0 +1,27 @@
+"""
+Request dependencies shared by the API routers
+
+The managers are created in main.py's lifespan and put on app.state; the
+routers take them from there, never by importing main (ADR-0010). The
+lifespan builds all four unconditionally before serving, and a constructor
+or initialize() that raises aborts the startup, so they are handed out as
+they are, with no "not initialized" check on every request.
+"""
+
+from fastapi import Request
+
+from core.device_manager import DeviceManager
+from core.eep_manager import EEPManager
+from core.telegram_buffer import TelegramBuffer
+
+
+def get_device_manager(request: Request) -> DeviceManager:
+    return request.app.state.device_manager
+
+
+def get_eep_manager(request: Request) -> EEPManager:
+    return request.app.state.eep_manager
+
+
+def get_telegram_buffer(request: Request) -> TelegramBuffer:
+    return request.app.state.telegram_buffer
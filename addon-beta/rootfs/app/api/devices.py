@@ -2,15 +2,22 @@
 Devices API - CRUD operations for EnOcean devices
 """
 
-from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import BaseModel, ConfigDict
 from typing import Optional, List, Dict, Any
 
+from core.eep_manager import normalize_eep_part
+from core.device_manager import DeviceManager
+from .deps import get_device_manager
+from .responses import FastJSONResponse
+
 router = APIRouter()
 
 
 class DeviceCreate(BaseModel):
     """Device creation model"""
+    # Surrounding whitespace is stripped during validation (in pydantic-core).
+    model_config = ConfigDict(str_strip_whitespace=True)
     name: str
     address: str
     rorg: str
@@ -28,6 +35,7 @@ class DeviceCreate(BaseModel):
 
 class DeviceUpdate(BaseModel):
     """Device update model"""
+    model_config = ConfigDict(str_strip_whitespace=True)
     name: Optional[str] = None  # rename: the name is the primary key + MQTT topic base
     address: Optional[str] = None
     rorg: Optional[str] = None
@@ -95,24 +103,17 @@ async def _publish_discovery(device, mqtt_handler, mapping_manager, device_manag
 
 
 @router.get("")
-async def list_devices(request: Request) -> List[Dict[str, Any]]:
+async def list_devices(device_manager: DeviceManager = Depends(get_device_manager)) -> FastJSONResponse:
     """Get all devices"""
-    device_manager = request.app.state.device_manager
-    if not device_manager:
-        raise HTTPException(status_code=500, detail="Device manager not initialized")
-
-    return device_manager.get_all_devices()
+    return FastJSONResponse(device_manager.get_all_devices())
 
 
 @router.get("/search/{query}")
-async def search_devices(query: str, request: Request) -> List[Dict[str, Any]]:
+async def search_devices(query: str,
+                         device_manager: DeviceManager = Depends(get_device_manager)) -> FastJSONResponse:
     """Search devices"""
-    device_manager = request.app.state.device_manager
-    if not device_manager:
-        raise HTTPException(status_code=500, detail="Device manager not initialized")
-
     results = device_manager.search_devices(query)
-    return [d.to_dict() for d in results]
+    return FastJSONResponse([d.to_dict() for d in results])
 
 
 # ":path" instead of a plain path parameter, because a device created before
@@ -123,12 +124,9 @@ async def search_devices(query: str, request: Request) -> List[Dict[str, Any]]:
 # _validate_device_name; this only keeps existing ones reachable so they can be
 # renamed out.
 @router.get("/{name:path}")
-async def get_device(name: str, request: Request) -> Dict[str, Any]:
+async def get_device(name: str,
+                     device_manager: DeviceManager = Depends(get_device_manager)) -> Dict[str, Any]:
     """Get a specific device"""
-    device_manager = request.app.state.device_manager
-    if not device_manager:
-        raise HTTPException(status_code=500, detail="Device manager not initialized")
-
     device = device_manager.get_device(name)
     if not device:
         raise HTTPException(status_code=404, detail=f"Device '{name}' not found")
@@ -137,12 +135,9 @@ async def get_device(name: str, request: Request) -> Dict[str, Any]:
 
 
 @router.post("")
-async def create_device(device: DeviceCreate, request: Request) -> Dict[str, Any]:
+async def create_device(device: DeviceCreate, request: Request,
+                        device_manager: DeviceManager = Depends(get_device_manager)) -> Dict[str, Any]:
     """Create a new device"""
-    device_manager = request.app.state.device_manager
-    if not device_manager:
-        raise HTTPException(status_code=500, detail="Device manager not initialized")
-
     device.name = _validate_device_name(device.name)
 
     # Check if device already exists
@@ -154,9 +149,9 @@ async def create_device(device: DeviceCreate, request: Request) -> Dict[str, Any
     new_device = Device(
         name=device.name,
         address=device.address,
-        rorg=device.rorg.upper().replace("0X", ""),
-        func=device.func.upper().replace("0X", "").zfill(2),
-        type=device.type.upper().replace("0X", "").zfill(2),
+        rorg=normalize_eep_part(device.rorg),
+        func=normalize_eep_part(device.func),
+        type=normalize_eep_part(device.type),
         sender_id=device.sender_id or "",
         description=device.description or "",
         room=device.room or "",
@@ -188,42 +183,22 @@ async def create_device(device: DeviceCreate, request: Request) -> Dict[str, Any
 
 
 @router.put("/{name:path}")  # see get_device for why ":path"
-async def update_device(name: str, update: DeviceUpdate, request: Request) -> Dict[str, Any]:
+async def update_device(name: str, update: DeviceUpdate, request: Request,
+                        device_manager: DeviceManager = Depends(get_device_manager)) -> Dict[str, Any]:
     """Update a device"""
-    device_manager = request.app.state.device_manager
-    if not device_manager:
-        raise HTTPException(status_code=500, detail="Device manager not initialized")
-
     device = device_manager.get_device(name)
     if not device:
         raise HTTPException(status_code=404, detail=f"Device '{name}' not found")
 
-    # Build update dict
-    update_data = {}
-    if update.address is not None:
-        update_data["address"] = update.address
-    if update.rorg is not None:
-        update_data["rorg"] = update.rorg.upper().replace("0X", "")
-    if update.func is not None:
-        update_data["func"] = update.func.upper().replace("0X", "").zfill(2)
-    if update.type is not None:
-        update_data["type"] = update.type.upper().replace("0X", "").zfill(2)
-    if update.sender_id is not None:
-        update_data["sender_id"] = update.sender_id
-    if update.description is not None:
-        update_data["description"] = update.description
-    if update.room is not None:
-        update_data["room"] = update.room
-    if update.manufacturer is not None:
-        update_data["manufacturer"] = update.manufacturer
-    if update.actuator_type is not None:
-        update_data["actuator_type"] = update.actuator_type
-    if update.invert is not None:
-        update_data["invert"] = bool(update.invert)
-    if update.availability_timeout is not None:
-        update_data["availability_timeout"] = max(0, int(update.availability_timeout))
-    if update.channel is not None:
-        update_data["channel"] = int(update.channel)
+    # Build update dict from the fields that were sent with a value (None
+    # means "leave as is"). The name is not a field update, a rename re-keys
+    # the device and is handled below.
+    update_data = update.model_dump(exclude={"name"}, exclude_none=True)
+    for key in ("rorg", "func", "type"):
+        if key in update_data:
+            update_data[key] = normalize_eep_part(update_data[key])
+    if "availability_timeout" in update_data:
+        update_data["availability_timeout"] = max(0, update_data["availability_timeout"])
 
     # Snapshot the current discovery identity BEFORE mutating the device.
     # update_device mutates the Device in place, so we capture the old
@@ -261,13 +236,12 @@ async def update_device(name: str, update: DeviceUpdate, request: Request) -> Di
             )
         name = update.name
 
-    success = await device_manager.update_device(name, update_data)
-    if not success:
+    updated_device = await device_manager.update_device(name, update_data)
+    if not updated_device:
         raise HTTPException(status_code=500, detail="Failed to update device")
 
     # Re-publish MQTT discovery (important when EEP/channel/identity changes)
-    updated_device = device_manager.get_device(name)
-    if mqtt_handler and mapping_manager and updated_device:
+    if mqtt_handler and mapping_manager:
         try:
             new_configs = _build_discovery_configs(updated_device, mqtt_handler, mapping_manager, device_manager)
             # Retract entities whose unique_id no longer exists after the edit
@@ -318,12 +292,9 @@ async def update_device(name: str, update: DeviceUpdate, request: Request) -> Di
 
 
 @router.delete("/{name:path}")  # see get_device for why ":path"
-async def delete_device(name: str, request: Request) -> Dict[str, str]:
+async def delete_device(name: str, request: Request,
+                        device_manager: DeviceManager = Depends(get_device_manager)) -> Dict[str, str]:
     """Delete a device"""
-    device_manager = request.app.state.device_manager
-    if not device_manager:
-        raise HTTPException(status_code=500, detail="Device manager not initialized")
-
     device = device_manager.get_device(name)
     if not device:
         raise HTTPException(status_code=404, detail=f"Device '{name}' not found")
@@ -2,15 +2,23 @@
 EEP API - EnOcean Equipment Profile operations
 """
 
-from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from pydantic import BaseModel, ConfigDict
 from typing import Optional, List, Dict, Any
 
+from core.eep_manager import normalize_eep_part
+from core.eep_manager import EEPManager
+from .deps import get_eep_manager
+from .responses import FastJSONResponse
+
 router = APIRouter()
 
 
 class CustomProfileCreate(BaseModel):
     """Custom profile creation model"""
+    # Surrounding whitespace is stripped during validation (in pydantic-core),
+    # so the handlers no longer strip every field by hand.
+    model_config = ConfigDict(str_strip_whitespace=True)
     rorg: str
     func: str
     type: str
@@ -20,53 +28,71 @@ class CustomProfileCreate(BaseModel):
 
 
 @router.get("")
-async def list_profiles(request: Request) -> List[Dict[str, Any]]:
+async def list_profiles(request: Request,
+                        eep_manager: EEPManager = Depends(get_eep_manager)) -> Response:
     """Get all EEP profiles"""
-    eep_manager = request.app.state.eep_manager
-    if not eep_manager:
-        raise HTTPException(status_code=500, detail="EEP manager not initialized")
+    # Same scheme as the tree below: the list only changes when
+    # EEPManager.version does, so its encoded JSON is kept until then.
+    cached = getattr(request.app.state, "eep_list_cache", None)
+    if cached is not None and cached[0] == eep_manager.version:
+        return Response(content=cached[1], media_type="application/json")
 
-    return eep_manager.get_all_profiles()
+    version = eep_manager.version
+    response = FastJSONResponse(eep_manager.get_all_profiles())
+    request.app.state.eep_list_cache = (version, response.body)
+    return response
 
 
 @router.get("/tree")
-async def get_profile_tree(request: Request) -> Dict[str, Any]:
+async def get_profile_tree(request: Request,
+                           eep_manager: EEPManager = Depends(get_eep_manager)) -> Response:
     """Get profiles organized as a tree structure by RORG/FUNC/TYPE"""
-    eep_manager = request.app.state.eep_manager
-    if not eep_manager:
-        raise HTTPException(status_code=500, detail="EEP manager not initialized")
-
+    # The UI fetches the tree on every navigation, but it only changes when
+    # profiles or mapping overrides do - EEPManager.version tracks exactly that.
+    # The encoded JSON is kept, so a cache hit does no serializing at all.
+    cached = getattr(request.app.state, "eep_tree_cache", None)
+    if cached is not None and cached[0] == eep_manager.version:
+        return Response(content=cached[1], media_type="application/json")
+
+    version = eep_manager.version
     tree = {}
-    overrides = await eep_manager.get_all_mapping_overrides()
+    overrides = eep_manager.get_all_mapping_overrides_sync()
 
     # Track which override keys are matched to existing profiles
     matched_override_keys = set()
 
     for profile in eep_manager.profiles.values():
-        if profile.rorg not in tree:
-            tree[profile.rorg] = {
+        # Keep hold of the node at each level instead of indexing down from
+        # the root again for every check and assignment.
+        rorg_node = tree.get(profile.rorg)
+        if rorg_node is None:
+            rorg_node = tree[profile.rorg] = {
                 "rorg": profile.rorg,
                 "description": _get_rorg_description(profile.rorg),
                 "funcs": {}
             }
 
-        if profile.func not in tree[profile.rorg]["funcs"]:
-            tree[profile.rorg]["funcs"][profile.func] = {
+        funcs = rorg_node["funcs"]
+        func_node = funcs.get(profile.func)
+        if func_node is None:
+            func_node = funcs[profile.func] = {
                 "func": profile.func,
                 "description": "",
                 "types": {}
             }
 
-        eep_upper = profile.eep_id.upper()
-        if eep_upper in overrides:
+        eep_id = profile.eep_id  # a property, formatted on every access
+        eep_upper = eep_id.upper()
+        has_override = eep_upper in overrides
+        if has_override:
             matched_override_keys.add(eep_upper)
 
-        tree[profile.rorg]["funcs"][profile.func]["types"][profile.type] = {
+        func_node["types"][profile.type] = {
             "type": profile.type,
-            "eep_id": profile.eep_id,
+            "eep_id": eep_id,
             "description": profile.description,
             "is_custom": profile.is_custom,
-            "has_mapping_override": eep_upper in overrides
+            "has_mapping_override": has_override
         }
 
     # Find orphaned overrides (keys in mapping_overrides.json that don't match any loaded profile)
@@ -75,38 +101,31 @@ async def get_profile_tree(request: Request) -> Dict[str, Any]:
         if key not in matched_override_keys:
             orphaned.append({"eep_id": key, "mapping": overrides[key]})
 
-    return {"tree": tree, "orphaned_overrides": orphaned}
+    response = FastJSONResponse({"tree": tree, "orphaned_overrides": orphaned})
+    request.app.state.eep_tree_cache = (version, response.body)
+    return response
 
 
 @router.get("/search/{query}")
-async def search_profiles(query: str, request: Request) -> List[Dict[str, Any]]:
+async def search_profiles(query: str,
+                          eep_manager: EEPManager = Depends(get_eep_manager)) -> FastJSONResponse:
     """Search EEP profiles"""
-    eep_manager = request.app.state.eep_manager
-    if not eep_manager:
-        raise HTTPException(status_code=500, detail="EEP manager not initialized")
-
     results = eep_manager.search_profiles(query)
-    return [p.to_dict() for p in results]
+    return FastJSONResponse([p.to_dict() for p in results])
 
 
 @router.get("/rorg/{rorg}")
-async def get_profiles_by_rorg(rorg: str, request: Request) -> List[Dict[str, Any]]:
+async def get_profiles_by_rorg(rorg: str,
+                               eep_manager: EEPManager = Depends(get_eep_manager)) -> FastJSONResponse:
     """Get profiles by RORG"""
-    eep_manager = request.app.state.eep_manager
-    if not eep_manager:
-        raise HTTPException(status_code=500, detail="EEP manager not initialized")
-
     results = eep_manager.get_profiles_by_rorg(rorg)
-    return [p.to_dict() for p in results]
+    return FastJSONResponse([p.to_dict() for p in results])
 
 
 @router.get("/{eep_id}")
-async def get_profile(eep_id: str, request: Request) -> Dict[str, Any]:
+async def get_profile(eep_id: str,
+                      eep_manager: EEPManager = Depends(get_eep_manager)) -> Dict[str, Any]:
     """Get a specific EEP profile, including any mapping override"""
-    eep_manager = request.app.state.eep_manager
-    if not eep_manager:
-        raise HTTPException(status_code=500, detail="EEP manager not initialized")
-
     profile = eep_manager.get_profile(eep_id)
     if not profile:
         raise HTTPException(status_code=404, detail=f"Profile '{eep_id}' not found")
@@ -126,12 +145,9 @@ async def get_profile(eep_id: str, request: Request) -> Dict[str, Any]:
 
 
 @router.get("/{eep_id}/mapping")
-async def get_profile_mapping(eep_id: str, request: Request) -> Dict[str, Any]:
+async def get_profile_mapping(eep_id: str,
+                              eep_manager: EEPManager = Depends(get_eep_manager)) -> Dict[str, Any]:
     """Get the effective HA mapping for a profile (override or default)"""
-    eep_manager = request.app.state.eep_manager
-    if not eep_manager:
-        raise HTTPException(status_code=500, detail="EEP manager not initialized")
-
     profile = eep_manager.get_profile(eep_id)
     if not profile:
         raise HTTPException(status_code=404, detail=f"Profile '{eep_id}' not found")
@@ -147,12 +163,9 @@ async def get_profile_mapping(eep_id: str, request: Request) -> Dict[str, Any]:
 
 
 @router.put("/{eep_id}/mapping")
-async def save_profile_mapping(eep_id: str, request: Request) -> Dict[str, Any]:
+async def save_profile_mapping(eep_id: str, request: Request,
+                               eep_manager: EEPManager = Depends(get_eep_manager)) -> Dict[str, Any]:
     """Save a mapping override for any EEP profile"""
-    eep_manager = request.app.state.eep_manager
-    if not eep_manager:
-        raise HTTPException(status_code=500, detail="EEP manager not initialized")
-
     profile = eep_manager.get_profile(eep_id)
     if not profile:
         raise HTTPException(status_code=404, detail=f"Profile '{eep_id}' not found")
@@ -182,12 +195,9 @@ async def save_profile_mapping(eep_id: str, request: Request) -> Dict[str, Any]:
 
 
 @router.delete("/{eep_id}/mapping")
-async def delete_profile_mapping(eep_id: str, request: Request) -> Dict[str, Any]:
+async def delete_profile_mapping(eep_id: str,
+                                 eep_manager: EEPManager = Depends(get_eep_manager)) -> Dict[str, Any]:
     """Delete mapping override for a standard profile (revert to EEP.xml default)"""
-    eep_manager = request.app.state.eep_manager
-    if not eep_manager:
-        raise HTTPException(status_code=500, detail="EEP manager not initialized")
-
     profile = eep_manager.get_profile(eep_id)
     if not profile:
         raise HTTPException(status_code=404, detail=f"Profile '{eep_id}' not found")
@@ -212,23 +222,20 @@ async def delete_profile_mapping(eep_id: str, request: Request) -> Dict[str, Any
 
 
 @router.post("/custom")
-async def create_custom_profile(profile: CustomProfileCreate, request: Request) -> Dict[str, Any]:
+async def create_custom_profile(profile: CustomProfileCreate,
+                                eep_manager: EEPManager = Depends(get_eep_manager)) -> Dict[str, Any]:
     """Create a custom EEP profile"""
-    eep_manager = request.app.state.eep_manager
-    if not eep_manager:
-        raise HTTPException(status_code=500, detail="EEP manager not initialized")
-
     # Validate required fields are not empty
-    if not profile.rorg.strip() or not profile.func.strip() or not profile.type.strip():
+    if not profile.rorg or not profile.func or not profile.type:
         raise HTTPException(status_code=400, detail="RORG, FUNC, and TYPE are required")
-    if not profile.description.strip():
+    if not profile.description:
         raise HTTPException(status_code=400, detail="Description is required")
 
     profile_data = {
-        "rorg": profile.rorg.strip().upper().replace("0X", ""),
-        "func": profile.func.strip().upper().replace("0X", "").zfill(2),
-        "type": profile.type.strip().upper().replace("0X", "").zfill(2),
-        "description": profile.description.strip(),
+        "rorg": normalize_eep_part(profile.rorg),
+        "func": normalize_eep_part(profile.func),
+        "type": normalize_eep_part(profile.type),
+        "description": profile.description,
         "fields": profile.fields
     }
 
@@ -248,12 +255,9 @@ async def create_custom_profile(profile: CustomProfileCreate, request: Request)
 
 
 @router.put("/custom/{eep_id}")
-async def update_custom_profile(eep_id: str, profile: CustomProfileCreate, request: Request) -> Dict[str, Any]:
+async def update_custom_profile(eep_id: str, profile: CustomProfileCreate,
+                                eep_manager: EEPManager = Depends(get_eep_manager)) -> Dict[str, Any]:
     """Update a custom EEP profile"""
-    eep_manager = request.app.state.eep_manager
-    if not eep_manager:
-        raise HTTPException(status_code=500, detail="EEP manager not initialized")
-
     existing = eep_manager.get_profile(eep_id)
     if not existing:
         raise HTTPException(status_code=404, detail=f"Profile '{eep_id}' not found")
@@ -262,9 +266,9 @@ async def update_custom_profile(eep_id: str, profile: CustomProfileCreate, reque
         raise HTTPException(status_code=400, detail="Cannot modify built-in profile")
 
     profile_data = {
-        "rorg": profile.rorg.upper().replace("0X", ""),
-        "func": profile.func.upper().replace("0X", "").zfill(2),
-        "type": profile.type.upper().replace("0X", "").zfill(2),
+        "rorg": normalize_eep_part(profile.rorg),
+        "func": normalize_eep_part(profile.func),
+        "type": normalize_eep_part(profile.type),
         "description": profile.description,
         "fields": profile.fields
     }
@@ -278,12 +282,9 @@ async def update_custom_profile(eep_id: str, profile: CustomProfileCreate, reque
 
 
 @router.delete("/custom/{eep_id}")
-async def delete_custom_profile(eep_id: str, request: Request) -> Dict[str, str]:
+async def delete_custom_profile(eep_id: str,
+                                eep_manager: EEPManager = Depends(get_eep_manager)) -> Dict[str, str]:
     """Delete a custom EEP profile"""
-    eep_manager = request.app.state.eep_manager
-    if not eep_manager:
-        raise HTTPException(status_code=500, detail="EEP manager not initialized")
-
     existing = eep_manager.get_profile(eep_id)
     if not existing:
         raise HTTPException(status_code=404, detail=f"Profile '{eep_id}' not found")
@@ -298,15 +299,17 @@ async def delete_custom_profile(eep_id: str, request: Request) -> Dict[str, str]
     return {"status": "deleted"}
 
 
+_RORG_DESCRIPTIONS = {
+    "F6": "RPS Telegram (Rocker Switch)",
+    "D5": "1BS Telegram (1 Byte Sensor)",
+    "A5": "4BS Telegram (4 Byte Sensor)",
+    "D2": "VLD Telegram (Variable Length Data)",
+    "D0": "Signal Telegram",
+    "D1": "MSC Telegram",
+    "D4": "UTE Telegram",
+}
+
+
 def _get_rorg_description(rorg: str) -> str:
     """Get description for RORG"""
-    descriptions = {
-        "F6": "RPS Telegram (Rocker Switch)",
-        "D5": "1BS Telegram (1 Byte Sensor)",
-        "A5": "4BS Telegram (4 Byte Sensor)",
-        "D2": "VLD Telegram (Variable Length Data)",
-        "D0": "Signal Telegram",
-        "D1": "MSC Telegram",
-        "D4": "UTE Telegram",
-    }
-    return descriptions.get(rorg.upper(), f"RORG {rorg}")
+    return _RORG_DESCRIPTIONS.get(rorg.upper(), f"RORG {rorg}")
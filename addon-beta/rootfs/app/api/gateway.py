@@ -3,16 +3,41 @@ Gateway API - EnOcean gateway operations (teach-in, send commands)
 """
 
 import asyncio
-from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
-from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, ConfigDict
+from typing import Optional, List, Dict, Any, Set
 import logging
 
+from core.device_manager import DeviceManager
+from core.serial_handler import parse_enocean_id
+from core.telegram_buffer import TelegramBuffer
+from .deps import get_device_manager, get_telegram_buffer
+from .responses import FastJSONResponse
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 # Store active teach-in sessions
-active_teach_in_sessions: Dict[str, WebSocket] = {}
+active_teach_in_sessions: Set[WebSocket] = set()
+
+
+async def _broadcast_teach_in(data: Dict[str, Any]):
+    """The serial handler's teach-in callback while any session is open.
+
+    The handler holds a single callback, so every open session is served from
+    here: the message is encoded once (as send_json would) and sent to all of
+    them concurrently. One failing socket does not hold up or break the rest.
+    """
+    sessions = list(active_teach_in_sessions)
+    message = json.dumps({"type": "teach_in", "data": data},
+                         separators=(",", ":"), ensure_ascii=False)
+    results = await asyncio.gather(*(ws.send_text(message) for ws in sessions),
+                                   return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Failed to send teach-in to WebSocket: {result}")
+    logger.info(f"Teach-in data sent to {len(sessions)} WebSocket(s): {data}")
 
 
 class TeachInResult(BaseModel):
@@ -26,6 +51,7 @@ class TeachInResult(BaseModel):
 
 class ActorTeachInRequest(BaseModel):
     """Request to send teach-in to an actuator"""
+    model_config = ConfigDict(str_strip_whitespace=True)
     destination: str  # Target actuator address (hex, e.g. "0x05834FA4")
     sender_offset: int = 1  # Offset from base ID (1-127)
     actuator_type: str = "switch"  # "switch"→F6, "light"→A5-38-08, "cover"→F6
@@ -33,6 +59,7 @@ class ActorTeachInRequest(BaseModel):
 
 class RepeatTeachInRequest(BaseModel):
     """Request to send teach-in repeatedly for 30 seconds"""
+    model_config = ConfigDict(str_strip_whitespace=True)
     destination: str  # Target actuator address (hex)
     sender_offset: int = 1
     actuator_type: str = "switch"
@@ -42,6 +69,7 @@ class RepeatTeachInRequest(BaseModel):
 
 class TestActuatorRequest(BaseModel):
     """Request to test an actuator with F6 rocker command"""
+    model_config = ConfigDict(str_strip_whitespace=True)
     device_name: str
     command: str  # "ON", "OFF", "OPEN", "CLOSE", "STOP"
 
@@ -119,7 +147,7 @@ async def teach_in_actuator(req: ActorTeachInRequest, request: Request) -> Dict[
 
     # Parse destination address
     try:
-        dest = int(req.destination.replace("0x", "").replace("0X", ""), 16)
+        dest = parse_enocean_id(req.destination)
     except ValueError:
         raise HTTPException(status_code=400, detail=f"Invalid destination address: {req.destination}")
 
@@ -166,7 +194,7 @@ async def teach_in_repeat(req: RepeatTeachInRequest, request: Request) -> Dict[s
         raise HTTPException(status_code=400, detail="sender_offset must be between 1 and 127")
 
     try:
-        dest = int(req.destination.replace("0x", "").replace("0X", ""), 16)
+        dest = parse_enocean_id(req.destination)
     except ValueError:
         raise HTTPException(status_code=400, detail=f"Invalid destination address: {req.destination}")
 
@@ -205,7 +233,8 @@ async def teach_in_repeat(req: RepeatTeachInRequest, request: Request) -> Dict[s
 
 
 @router.post("/test-actuator")
-async def test_actuator(req: TestActuatorRequest, request: Request) -> Dict[str, Any]:
+async def test_actuator(req: TestActuatorRequest, request: Request,
+                        device_manager: DeviceManager = Depends(get_device_manager)) -> Dict[str, Any]:
     """Send command to test an actuator (light/switch/cover).
 
     - Dimmers (actuator_type="light"): uses A5-38-08 Central Command Dimming
@@ -213,14 +242,10 @@ async def test_actuator(req: TestActuatorRequest, request: Request) -> Dict[str,
     This endpoint allows testing directly from the UI without MQTT.
     """
     serial_handler = request.app.state.serial_handler
-    device_manager = request.app.state.device_manager
 
     if not serial_handler or not serial_handler.is_connected:
         raise HTTPException(status_code=503, detail="EnOcean gateway not connected")
 
-    if not device_manager:
-        raise HTTPException(status_code=500, detail="Device manager not initialized")
-
     device = device_manager.get_device(req.device_name)
     if not device:
         raise HTTPException(status_code=404, detail=f"Device '{req.device_name}' not found")
@@ -232,12 +257,12 @@ async def test_actuator(req: TestActuatorRequest, request: Request) -> Dict[str,
         raise HTTPException(status_code=400, detail="Device has no sender_id configured")
 
     try:
-        sender_id = int(device.sender_id.replace("0x", "").replace("0X", ""), 16)
-        destination = int(device.address.replace("0x", "").replace("0X", ""), 16)
+        sender_id = parse_enocean_id(device.sender_id)
+        destination = parse_enocean_id(device.address)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid address: {e}")
 
-    command = req.command.strip().upper()
+    command = req.command.upper()
 
     # Dimmers use A5-38-08 Central Command Dimming
     # Use DIM mode (dim_mode=1) with explicit brightness, not ON (dim_mode=0/stored).
@@ -262,38 +287,9 @@ async def test_actuator(req: TestActuatorRequest, request: Request) -> Dict[str,
             "destination": device.address
         }
 
-    # Switches and covers use F6 rocker commands (broadcast)
-    broadcast = 0xFFFFFFFF
-
-    if command in ("ON", "OPEN"):
-        # Rocker B top (BI) pressed + release
-        await serial_handler.send_telegram(
-            sender_id=sender_id, rorg=0xF6,
-            data=bytes([0x50]), destination=broadcast, status=0x30
-        )
-        await asyncio.sleep(0.1)
-        await serial_handler.send_telegram(
-            sender_id=sender_id, rorg=0xF6,
-            data=bytes([0x00]), destination=broadcast, status=0x20
-        )
-    elif command in ("OFF", "CLOSE"):
-        # Rocker B bottom (B0) pressed + release
-        await serial_handler.send_telegram(
-            sender_id=sender_id, rorg=0xF6,
-            data=bytes([0x70]), destination=broadcast, status=0x30
-        )
-        await asyncio.sleep(0.1)
-        await serial_handler.send_telegram(
-            sender_id=sender_id, rorg=0xF6,
-            data=bytes([0x00]), destination=broadcast, status=0x20
-        )
-    elif command == "STOP":
-        # Release without prior press = stop
-        await serial_handler.send_telegram(
-            sender_id=sender_id, rorg=0xF6,
-            data=bytes([0x00]), destination=broadcast, status=0x20
-        )
-    else:
+    # Switches and covers use F6 rocker commands (broadcast):
+    # ON/OPEN = BI press + release, OFF/CLOSE = B0, STOP = release only
+    if not await serial_handler.send_f6_rocker(sender_id, command):
         raise HTTPException(status_code=400, detail=f"Unknown command: {command}. Use ON, OFF, OPEN, CLOSE, or STOP.")
 
     logger.info(f"Test actuator (F6): {req.device_name} ({device.actuator_type}) = {command}")
@@ -312,8 +308,7 @@ async def teach_in_websocket(websocket: WebSocket):
     """WebSocket endpoint for teach-in mode"""
     await websocket.accept()
 
-    session_id = str(id(websocket))
-    active_teach_in_sessions[session_id] = websocket
+    session_id = id(websocket)  # for the log lines only
     serial_handler = None
 
     logger.info(f"Teach-in session started: {session_id}")
@@ -329,19 +324,10 @@ async def teach_in_websocket(websocket: WebSocket):
             })
             return
 
-        # Set up teach-in callback
-        async def on_teach_in(data: Dict[str, Any]):
-            if session_id in active_teach_in_sessions:
-                try:
-                    await active_teach_in_sessions[session_id].send_json({
-                        "type": "teach_in",
-                        "data": data
-                    })
-                    logger.info(f"Teach-in data sent to WebSocket: {data}")
-                except Exception as e:
-                    logger.error(f"Failed to send teach-in to WebSocket: {e}")
-
-        serial_handler.set_teach_in_callback(on_teach_in)
+        # Join the broadcast. Before, each session replaced the callback, so
+        # only the newest one heard anything.
+        active_teach_in_sessions.add(websocket)
+        serial_handler.set_teach_in_callback(_broadcast_teach_in)
 
         # Send ready message
         await websocket.send_json({
@@ -371,77 +357,55 @@ async def teach_in_websocket(websocket: WebSocket):
     except Exception as e:
         logger.error(f"Teach-in session error: {e}", exc_info=True)
     finally:
-        # Clean up
-        if session_id in active_teach_in_sessions:
-            del active_teach_in_sessions[session_id]
-
-        # Remove callback
-        if serial_handler:
+        # Clean up. The callback goes only with the last session; another
+        # open tab must keep receiving.
+        active_teach_in_sessions.discard(websocket)
+        if serial_handler and not active_teach_in_sessions:
             serial_handler.set_teach_in_callback(None)
 
         logger.info(f"Teach-in session ended: {session_id}")
 
 
 @router.get("/recent-telegrams")
-async def get_recent_telegrams(limit: int = 50, request: Request = None) -> List[Dict[str, Any]]:
+async def get_recent_telegrams(limit: int = 50,
+                               telegram_buffer: TelegramBuffer = Depends(get_telegram_buffer)) -> FastJSONResponse:
     """Get recent received telegrams (for debugging)"""
-    telegram_buffer = request.app.state.telegram_buffer if request else None
-
-    if not telegram_buffer:
-        return []
-
-    return telegram_buffer.get_recent(limit)
+    return FastJSONResponse(telegram_buffer.get_recent(limit))
 
 
 @router.get("/unknown-devices")
-async def get_unknown_devices(request: Request) -> List[Dict[str, Any]]:
+async def get_unknown_devices(telegram_buffer: TelegramBuffer = Depends(get_telegram_buffer),
+                              device_manager: DeviceManager = Depends(get_device_manager)) -> List[Dict[str, Any]]:
     """Get list of unknown devices that have sent telegrams (excludes configured devices)"""
-    telegram_buffer = request.app.state.telegram_buffer if request else None
-
-    if not telegram_buffer:
-        return []
-
     unknown = telegram_buffer.get_unknown_devices()
 
     # Filter out devices that are already configured
-    device_manager = getattr(request.app.state, 'device_manager', None)
-    if device_manager:
-        configured_addresses = set()
-        for device in device_manager.devices.values():
-            addr = device.address.upper().replace("0X", "0x")
-            configured_addresses.add(addr)
-            # Also add without 0x prefix
-            configured_addresses.add(addr.replace("0x", ""))
-
-        unknown = [
-            d for d in unknown
-            if d["sender_id"].upper().replace("0X", "0x") not in configured_addresses
-            and d["sender_id"].upper().replace("0x", "").replace("0X", "") not in configured_addresses
-        ]
+    configured_addresses = set()
+    for device in device_manager.devices.values():
+        addr = device.address.upper().replace("0X", "0x")
+        configured_addresses.add(addr)
+        # Also add without 0x prefix
+        configured_addresses.add(addr.replace("0x", ""))
+
+    unknown = [
+        d for d in unknown
+        if d["sender_id"].upper().replace("0X", "0x") not in configured_addresses
+        and d["sender_id"].upper().replace("0x", "").replace("0X", "") not in configured_addresses
+    ]
 
     return unknown
 
 
 @router.post("/clear-telegrams")
-async def clear_telegrams(request: Request) -> Dict[str, Any]:
+async def clear_telegrams(telegram_buffer: TelegramBuffer = Depends(get_telegram_buffer)) -> Dict[str, Any]:
     """Clear all stored telegrams and unknown devices"""
-    telegram_buffer = request.app.state.telegram_buffer if request else None
-
-    if not telegram_buffer:
-        return {"status": "no buffer"}
-
     telegram_buffer.clear()
     return {"status": "cleared"}
 
 
 @router.get("/telegram-stats")
-async def get_telegram_stats(request: Request) -> Dict[str, Any]:
+async def get_telegram_stats(telegram_buffer: TelegramBuffer = Depends(get_telegram_buffer)) -> Dict[str, Any]:
     """Get telegram buffer statistics"""
-    telegram_buffer = request.app.state.telegram_buffer if request else None
-
-    if not telegram_buffer:
-        return {"total_count": 0, "max_size": 0, "unknown_device_count": 0}
-
     return telegram_buffer.get_stats()
 
 
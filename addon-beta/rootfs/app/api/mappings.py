@@ -4,48 +4,288 @@ Mappings API - MQTT/HA entity mappings management
 
 import os
 import shutil
+import asyncio
 from datetime import datetime
 from fastapi import APIRouter, HTTPException, Request, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import yaml
-import aiofiles
+
+from core import file_io, yaml_io
+from .responses import FastJSONResponse, encode_json
 
 router = APIRouter()
 
 MAX_VERSIONS = 3  # Keep last 3 versions for rollback
 
 
+# Predefined mapping templates for common device types. Constant, so it is
+# encoded once at import and served as stored bytes.
+_TEMPLATES = {
+    "temperature_sensor": {
+        "TMP": {
+            "component": "sensor",
+            "name": "Temperature",
+            "device_class": "temperature",
+            "unit_of_measurement": "°C",
+            "icon": "mdi:thermometer"
+        }
+    },
+    "humidity_sensor": {
+        "HUM": {
+            "component": "sensor",
+            "name": "Humidity",
+            "device_class": "humidity",
+            "unit_of_measurement": "%",
+            "icon": "mdi:water-percent"
+        }
+    },
+    "contact_sensor": {
+        "CO": {
+            "component": "binary_sensor",
+            "name": "Contact",
+            "device_class": "door",
+            "icon": "mdi:door"
+        }
+    },
+    "occupancy_sensor": {
+        "OCC": {
+            "component": "binary_sensor",
+            "name": "Occupancy",
+            "device_class": "occupancy",
+            "icon": "mdi:motion-sensor"
+        }
+    },
+    "switch": {
+        "state": {
+            "component": "switch",
+            "name": "Switch",
+            "icon": "mdi:light-switch"
+        }
+    },
+    "dimmer": {
+        "DIM": {
+            "component": "light",
+            "name": "Dimmer",
+            "brightness": True,
+            "icon": "mdi:brightness-6"
+        }
+    },
+    "cover": {
+        "POS": {
+            "component": "cover",
+            "name": "Cover",
+            "device_class": "blind",
+            "icon": "mdi:blinds"
+        }
+    },
+    "kessel_staufix": {
+        "AL": {
+            "component": "binary_sensor",
+            "name": "Alarm",
+            "device_class": "problem",
+            "icon": "mdi:pipe-valve"
+        }
+    },
+    "common": {
+        "rssi": {
+            "component": "sensor",
+            "name": "RSSI",
+            "device_class": "signal_strength",
+            "unit_of_measurement": "dBm",
+            "icon": "mdi:wifi"
+        },
+        "last_update": {
+            "component": "sensor",
+            "name": "Last Update",
+            "device_class": "timestamp",
+            "icon": "mdi:clock"
+        }
+    }
+}
+_TEMPLATES_JSON = encode_json(_TEMPLATES)
+
+
 class MappingUpdate(BaseModel):
     """Mapping update model"""
     eep_id: str
     mappings: Dict[str, Dict[str, Any]]
 
 
-async def _create_backup(config_path: str, mappings_file: str):
-    """Create a backup before saving, rotating old versions"""
-    if not os.path.exists(mappings_file):
+def _mappings_cache(request: Request) -> Dict[str, Any]:
+    """The parsed mapping.yaml, kept on app.state between requests.
+
+    Every handler here used to read and parse the whole file again, and the UI
+    asks for it on every visit to the mappings page. The file only changes
+    through this router or through an import/restore, so the parsed dict is
+    kept together with the file's stat signature and reused while it matches.
+    """
+    cache = getattr(request.app.state, "mappings_cache", None)
+    if cache is None:
+        cache = {"signature": None, "data": None, "json": {}, "hits": 0, "misses": 0}
+        request.app.state.mappings_cache = cache
+    return cache
+
+
+def _file_signature(path: str):
+    """(mtime_ns, size) of a file, or None if it does not exist.
+
+    The size is part of it because mtime alone can repeat for different
+    content on filesystems with coarse timestamps (FAT on an SD card or USB).
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+async def _read_mappings(request: Request, mappings_file: str,
+                         signature: Optional[tuple] = None) -> Dict[str, Any]:
+    """Return the parsed mappings, from memory if the file is unchanged.
+
+    The returned dict is shared with the cache. Callers that modify it must
+    work on a copy and hand the result to _remember_mappings after writing.
+    A caller that has just taken the file's signature passes it in, so the
+    file is not stat()ed twice for one request.
+    """
+    cache = _mappings_cache(request)
+    if signature is None:
+        signature = _file_signature(mappings_file)
+    if signature is None:
+        return {}
+    if signature == cache["signature"] and cache["data"] is not None:
+        cache["hits"] += 1
+        return cache["data"]
+
+    data = await asyncio.to_thread(_load_mappings_sync, mappings_file)
+    cache["signature"] = signature
+    cache["data"] = data
+    cache["json"] = {}
+    cache["misses"] += 1
+    return data
+
+
+async def _read_mappings_json(request: Request, mappings_file: str, eep_id: Optional[str] = None,
+                              signature: Optional[tuple] = None) -> bytes:
+    """The mappings, or the entry get_mapping resolves eep_id to, as JSON.
+
+    Encoded once and kept with the parsed dict (and dropped with it), so a
+    GET of an unchanged file returns stored bytes without encoding anything.
+    """
+    data = await _read_mappings(request, mappings_file, signature)
+    if eep_id is not None:
+        eep_id = eep_id if eep_id in data else "common"
+
+    cache = _mappings_cache(request)
+    if cache["data"] is not data:  # no file, nothing is cached
+        return encode_json(data if eep_id is None else data.get(eep_id, {}))
+    encoded = cache["json"].get(eep_id)
+    if encoded is None:
+        encoded = encode_json(data if eep_id is None else data.get(eep_id, {}))
+        cache["json"][eep_id] = encoded
+    return encoded
+
+
+def _load_mappings_sync(path: str) -> Dict[str, Any]:
+    """Open, read and parse mapping.yaml in one go.
+
+    Runs in a worker thread. aiofiles needed a thread hop for the open and
+    another for the read, for a file of a few kilobytes, which cost more than
+    the read itself; this is one hop for the whole job.
+    """
+    with open(path, 'rb') as f:
+        return yaml_io.safe_load(f) or {}
+
+
+def _load_upload_sync(stream):
+    """Parse an uploaded YAML file from its spooled file object (worker thread)."""
+    stream.seek(0)
+    return yaml_io.safe_load(stream)
+
+
+def _rotate_backups_sync(path: str):
+    """Shift mapping.yaml.v1..vN up by one and make the current file v1.
+
+    Only directory entries move: v(N-1) -> vN by rename, and v1 becomes a
+    hard link to the current file, which the caller then replaces with
+    os.replace. The old content is never read or rewritten, and mapping.yaml
+    itself never goes missing in between.
+    """
+    if not os.path.exists(path):
         return
 
-    # Rotate existing backups (v3 -> delete, v2 -> v3, v1 -> v2, current -> v1)
-    for i in range(MAX_VERSIONS, 0, -1):
-        old_backup = os.path.join(config_path, f"mapping.yaml.v{i}")
-        if i == MAX_VERSIONS:
-            if os.path.exists(old_backup):
-                os.remove(old_backup)
-        else:
-            new_backup = os.path.join(config_path, f"mapping.yaml.v{i+1}")
-            if os.path.exists(old_backup):
-                shutil.move(old_backup, new_backup)
+    try:
+        os.remove(f"{path}.v{MAX_VERSIONS}")
+    except FileNotFoundError:
+        pass
+    for i in range(MAX_VERSIONS - 1, 0, -1):
+        try:
+            os.replace(f"{path}.v{i}", f"{path}.v{i + 1}")
+        except FileNotFoundError:
+            pass
+
+    try:
+        os.link(path, f"{path}.v1")
+    except OSError:
+        # Filesystem without hard links
+        shutil.copy2(path, f"{path}.v1")
+
+
+def _write_mappings_sync(path: str, data: Dict[str, Any], backup: bool = False):
+    """Serialize and write mapping.yaml in one go (worker thread).
+
+    Dumped before anything on disk changes, so a failed dump leaves the old
+    file and the backups untouched; file_io.write_atomic does the rest.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    content = yaml_io.dump(data)
+    if backup:
+        _rotate_backups_sync(path)
+    file_io.write_atomic(path, content)
+
+
+def _restore_backup_sync(path: str, version: int):
+    """Put mapping.yaml.v{version} back in place, keeping the current file as v1.
+
+    The chosen backup is read before rotating, because the rotation renames
+    it to the next version number (or drops it, for the oldest one).
+    """
+    with open(f"{path}.v{version}", 'rb') as f:
+        content = f.read()
+    _rotate_backups_sync(path)
+    file_io.write_atomic(path, content)
+
+
+async def _write_mappings(request: Request, mappings_file: str, data: Dict[str, Any],
+                          backup: bool = False):
+    """Write mapping.yaml off the event loop and keep the cache in step.
+
+    With backup=True the previous file is kept as mapping.yaml.v1.
+    """
+    await asyncio.to_thread(_write_mappings_sync, mappings_file, data, backup)
+    _remember_mappings(request, mappings_file, data)
+
+
+def _remember_mappings(request: Request, mappings_file: str, data: Dict[str, Any]):
+    """Put freshly written mappings into the cache, saving the re-read."""
+    cache = _mappings_cache(request)
+    cache["signature"] = _file_signature(mappings_file)
+    cache["data"] = data
+    cache["json"] = {}
 
-    # Copy current to v1
-    backup_file = os.path.join(config_path, "mapping.yaml.v1")
-    shutil.copy2(mappings_file, backup_file)
+
+def _forget_mappings(request: Request):
+    """Drop the cache after the file was replaced behind our back."""
+    cache = _mappings_cache(request)
+    cache["signature"] = None
+    cache["data"] = None
+    cache["json"] = {}
 
 
 @router.get("")
-async def get_all_mappings(request: Request) -> Dict[str, Any]:
+async def get_all_mappings(request: Request) -> Response:
     """Get all mappings with metadata"""
     config_path = request.app.state.config_path
     mappings_file = os.path.join(config_path, "mapping.yaml")
@@ -58,52 +298,59 @@ async def get_all_mappings(request: Request) -> Dict[str, Any]:
         }
     }
 
-    # Get available backup versions
+    # One directory read finds mapping.yaml and all its backups, instead of
+    # probing each name with exists() and then stat()ing it again. Only the
+    # files that are actually there get stat()ed, once each.
+    try:
+        with os.scandir(config_path) as it:
+            entries = {e.name: e for e in it if e.name.startswith("mapping.yaml")}
+    except FileNotFoundError:
+        entries = {}
+
     for i in range(1, MAX_VERSIONS + 1):
-        backup_file = os.path.join(config_path, f"mapping.yaml.v{i}")
-        if os.path.exists(backup_file):
-            mtime = os.path.getmtime(backup_file)
+        entry = entries.get(f"mapping.yaml.v{i}")
+        if entry is not None:
             result["metadata"]["versions_available"].append({
                 "version": i,
-                "date": datetime.fromtimestamp(mtime).isoformat()
+                "date": datetime.fromtimestamp(entry.stat().st_mtime).isoformat()
             })
 
-    if not os.path.exists(mappings_file):
-        return result
+    # The same stat answers "when was it modified" and "is the cached copy
+    # still current".
+    entry = entries.get("mapping.yaml")
+    if entry is None:
+        return FastJSONResponse(result)
+    st = entry.stat()
+    signature = (st.st_mtime_ns, st.st_size)
 
     try:
-        # Get last modified time
-        mtime = os.path.getmtime(mappings_file)
-        result["metadata"]["last_modified"] = datetime.fromtimestamp(mtime).isoformat()
-
-        async with aiofiles.open(mappings_file, 'r') as f:
-            content = await f.read()
-            result["mappings"] = yaml.safe_load(content) or {}
-            return result
+        result["metadata"]["last_modified"] = datetime.fromtimestamp(signature[0] / 1e9).isoformat()
+
+        # The mappings are the bulk of the reply and come pre-encoded; only
+        # the small metadata part is encoded per request.
+        mappings_json = await _read_mappings_json(request, mappings_file, signature=signature)
+        body = (b'{"mappings":' + mappings_json
+                + b',"metadata":' + encode_json(result["metadata"]) + b'}')
+        return Response(content=body, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read mappings: {e}")
 
 
+@router.get("/templates")
+async def get_mapping_templates() -> Response:
+    """Get predefined mapping templates for common device types"""
+    return Response(content=_TEMPLATES_JSON, media_type="application/json")
+
+
 @router.get("/{eep_id}")
-async def get_mapping(eep_id: str, request: Request) -> Dict[str, Any]:
-    """Get mapping for a specific EEP"""
+async def get_mapping(eep_id: str, request: Request) -> Response:
+    """Get mapping for a specific EEP (common mappings as fallback)"""
     config_path = request.app.state.config_path
     mappings_file = os.path.join(config_path, "mapping.yaml")
 
-    if not os.path.exists(mappings_file):
-        return {}
-
     try:
-        async with aiofiles.open(mappings_file, 'r') as f:
-            content = await f.read()
-            data = yaml.safe_load(content) or {}
-
-            # Check for EEP-specific mapping
-            if eep_id in data:
-                return data[eep_id]
-
-            # Return common mappings as fallback
-            return data.get("common", {})
+        body = await _read_mappings_json(request, mappings_file, eep_id)
+        return Response(content=body, media_type="application/json")
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read mapping: {e}")
@@ -116,23 +363,14 @@ async def update_mapping(eep_id: str, mapping: MappingUpdate, request: Request)
     mappings_file = os.path.join(config_path, "mapping.yaml")
 
     try:
-        # Create backup before modifying
-        await _create_backup(config_path, mappings_file)
-
-        # Load existing mappings
-        data = {}
-        if os.path.exists(mappings_file):
-            async with aiofiles.open(mappings_file, 'r') as f:
-                content = await f.read()
-                data = yaml.safe_load(content) or {}
+        # Load existing mappings (a copy, the cached dict is shared)
+        data = dict(await _read_mappings(request, mappings_file))
 
         # Update mapping
         data[eep_id] = mapping.mappings
 
-        # Save
-        os.makedirs(config_path, exist_ok=True)
-        async with aiofiles.open(mappings_file, 'w') as f:
-            await f.write(yaml.dump(data, default_flow_style=False, allow_unicode=True))
+        # Save, keeping the previous file as a backup
+        await _write_mappings(request, mappings_file, data, backup=True)
 
         return {"status": "updated"}
 
@@ -141,7 +379,7 @@ async def update_mapping(eep_id: str, mapping: MappingUpdate, request: Request)
 
 
 @router.post("/restore/{version}")
-async def restore_mapping_version(version: int, request: Request) -> Dict[str, str]:
+async def restore_mapping_version(version: int, request: Request) -> Dict[str, Any]:
     """Restore mappings from a previous version"""
     if version < 1 or version > MAX_VERSIONS:
         raise HTTPException(status_code=400, detail=f"Version must be between 1 and {MAX_VERSIONS}")
@@ -154,11 +392,9 @@ async def restore_mapping_version(version: int, request: Request) -> Dict[str, s
         raise HTTPException(status_code=404, detail=f"Version {version} not found")
 
     try:
-        # Create backup of current before restoring
-        await _create_backup(config_path, mappings_file)
-
-        # Restore from backup
-        shutil.copy2(backup_file, mappings_file)
+        # Restore from backup, keeping the current file as v1
+        await asyncio.to_thread(_restore_backup_sync, mappings_file, version)
+        _forget_mappings(request)
 
         return {"status": "restored", "version": version}
 
@@ -173,13 +409,8 @@ async def save_all_mappings(request: Request, data: Dict[str, Any]) -> Dict[str,
     mappings_file = os.path.join(config_path, "mapping.yaml")
 
     try:
-        # Create backup before saving
-        await _create_backup(config_path, mappings_file)
-
-        # Save new mappings
-        os.makedirs(config_path, exist_ok=True)
-        async with aiofiles.open(mappings_file, 'w') as f:
-            await f.write(yaml.dump(data, default_flow_style=False, allow_unicode=True))
+        # Save new mappings, keeping the previous file as a backup
+        await _write_mappings(request, mappings_file, data, backup=True)
 
         return {"status": "saved"}
 
@@ -197,17 +428,14 @@ async def delete_mapping(eep_id: str, request: Request) -> Dict[str, str]:
         raise HTTPException(status_code=404, detail="No mappings file found")
 
     try:
-        async with aiofiles.open(mappings_file, 'r') as f:
-            content = await f.read()
-            data = yaml.safe_load(content) or {}
+        data = dict(await _read_mappings(request, mappings_file))
 
         if eep_id not in data:
             raise HTTPException(status_code=404, detail=f"Mapping for '{eep_id}' not found")
 
         del data[eep_id]
 
-        async with aiofiles.open(mappings_file, 'w') as f:
-            await f.write(yaml.dump(data, default_flow_style=False, allow_unicode=True))
+        await _write_mappings(request, mappings_file, data)
 
         return {"status": "deleted"}
 
@@ -226,8 +454,11 @@ async def import_mappings(file: UploadFile = File(...), request: Request = None)
     config_path = request.app.state.config_path
 
     try:
-        content = await file.read()
-        data = yaml.safe_load(content)
+        # The upload is already spooled to a temporary file by Starlette.
+        # Parse it from there in a worker thread instead of reading it into
+        # one bytes object first, which kept the raw file and the parsed
+        # tree in memory together and parsed on the event loop.
+        data = await asyncio.to_thread(_load_upload_sync, file.file)
 
         if not isinstance(data, dict):
             raise HTTPException(status_code=400, detail="Invalid mapping format")
@@ -235,20 +466,16 @@ async def import_mappings(file: UploadFile = File(...), request: Request = None)
         mappings_file = os.path.join(config_path, "mapping.yaml")
 
         # Merge with existing
-        existing = {}
-        if os.path.exists(mappings_file):
-            async with aiofiles.open(mappings_file, 'r') as f:
-                existing_content = await f.read()
-                existing = yaml.safe_load(existing_content) or {}
+        existing = dict(await _read_mappings(request, mappings_file))
 
         existing.update(data)
 
-        os.makedirs(config_path, exist_ok=True)
-        async with aiofiles.open(mappings_file, 'w') as f:
-            await f.write(yaml.dump(existing, default_flow_style=False, allow_unicode=True))
+        await _write_mappings(request, mappings_file, existing)
 
         return {"status": "imported", "count": len(data)}
 
+    except HTTPException:
+        raise
     except yaml.YAMLError as e:
         raise HTTPException(status_code=400, detail=f"Invalid YAML: {e}")
     except Exception as e:
@@ -261,98 +488,23 @@ async def export_mappings(request: Request):
     config_path = request.app.state.config_path
     mappings_file = os.path.join(config_path, "mapping.yaml")
 
-    if not os.path.exists(mappings_file):
+    try:
+        st = os.stat(mappings_file)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="No mappings file found")
 
+    # Same (mtime, size) signature the mappings cache uses. "no-cache" makes
+    # the browser ask every time, so an export right after an edit is never
+    # stale, but an unchanged file is answered with a bare 304.
+    etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
     return FileResponse(
         mappings_file,
         media_type="application/x-yaml",
-        filename="mapping.yaml"
+        filename="mapping.yaml",
+        headers=headers,
+        stat_result=st
     )
-
-
-@router.get("/templates")
-async def get_mapping_templates() -> Dict[str, Any]:
-    """Get predefined mapping templates for common device types"""
-    return {
-        "temperature_sensor": {
-            "TMP": {
-                "component": "sensor",
-                "name": "Temperature",
-                "device_class": "temperature",
-                "unit_of_measurement": "°C",
-                "icon": "mdi:thermometer"
-            }
-        },
-        "humidity_sensor": {
-            "HUM": {
-                "component": "sensor",
-                "name": "Humidity",
-                "device_class": "humidity",
-                "unit_of_measurement": "%",
-                "icon": "mdi:water-percent"
-            }
-        },
-        "contact_sensor": {
-            "CO": {
-                "component": "binary_sensor",
-                "name": "Contact",
-                "device_class": "door",
-                "icon": "mdi:door"
-            }
-        },
-        "occupancy_sensor": {
-            "OCC": {
-                "component": "binary_sensor",
-                "name": "Occupancy",
-                "device_class": "occupancy",
-                "icon": "mdi:motion-sensor"
-            }
-        },
-        "switch": {
-            "state": {
-                "component": "switch",
-                "name": "Switch",
-                "icon": "mdi:light-switch"
-            }
-        },
-        "dimmer": {
-            "DIM": {
-                "component": "light",
-                "name": "Dimmer",
-                "brightness": True,
-                "icon": "mdi:brightness-6"
-            }
-        },
-        "cover": {
-            "POS": {
-                "component": "cover",
-                "name": "Cover",
-                "device_class": "blind",
-                "icon": "mdi:blinds"
-            }
-        },
-        "kessel_staufix": {
-            "AL": {
-                "component": "binary_sensor",
-                "name": "Alarm",
-                "device_class": "problem",
-                "icon": "mdi:pipe-valve"
-            }
-        },
-        "common": {
-            "rssi": {
-                "component": "sensor",
-                "name": "RSSI",
-                "device_class": "signal_strength",
-                "unit_of_measurement": "dBm",
-                "icon": "mdi:wifi"
-            },
-            "last_update": {
-                "component": "sensor",
-                "name": "Last Update",
-                "device_class": "timestamp",
-                "icon": "mdi:clock"
-            }
-        }
-    }
@@ -0,0 +1,35 @@
+"""
+Response helpers shared by the API routers
+"""
+
+import json
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+def encode_json(content) -> bytes:
+    """Encode to compact UTF-8 JSON the way FastJSONResponse sends it."""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=jsonable_encoder,
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response for the large list/tree payloads.
+
+    A handler that returns plain data makes FastAPI validate it against the
+    return annotation and then walk it once more in pure Python with
+    jsonable_encoder, before json.dumps even starts. Returning this response
+    instead skips both: the data goes straight to the C encoder in json, and
+    jsonable_encoder is only called for the odd value json cannot handle
+    (a date YAML parsed out of a custom profile), so the output is the same.
+    See ADR-0012 for why this is not orjson.
+    """
+
+    def render(self, content) -> bytes:
+        return encode_json(content)
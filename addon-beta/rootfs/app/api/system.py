@@ -3,18 +3,23 @@ System API - System status and configuration
 """
 
 import os
+import shutil
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException, Request, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File
 from fastapi.responses import FileResponse, StreamingResponse
 from typing import Dict, Any
 import json
-import yaml
 import aiofiles
 import zipfile
 import io
 from datetime import datetime
 from lxml import etree
 
+from core import file_io, yaml_io
+from core.eep_manager import EEPManager
+from .deps import get_eep_manager
+
 router = APIRouter()
 
 # Single source of truth (reads config.yaml), no manual bumping needed here.
@@ -45,6 +50,48 @@ async def _republish_after_restore(request):
         logger.error(f"Re-publish after restore failed: {e}")
 
 
+# What export and backup put into the ZIP, in this order, with
+# custom_eep/*.yaml in between the two groups.
+_CONFIG_FILES_HEAD = ("devices.yaml", "enoceanmqtt.devices", "mapping.yaml")
+_CONFIG_FILES_TAIL = ("EEP.xml", "mapping_overrides.yaml")
+
+
+def _custom_eep_files(config_path: str):
+    """The custom EEP profiles (custom_eep/*.yaml) as directory entries.
+
+    One scandir instead of exists() + listdir() + a join per file; the
+    entries carry their own path for zf.write.
+    """
+    try:
+        with os.scandir(os.path.join(config_path, "custom_eep")) as it:
+            return [e for e in it if e.name.endswith(".yaml") and e.is_file()]
+    except FileNotFoundError:
+        return []
+
+
+# The add-on's environment is set once by the run script from the add-on
+# options and does not change while the process runs (changing options means
+# a restart), so it is read once here, like main.py reads its settings,
+# rather than on every status poll.
+_CONFIG = {
+    "mqtt": {
+        "host": os.getenv("MQTT_HOST", ""),
+        "port": os.getenv("MQTT_PORT", "1883"),
+        "prefix": os.getenv("MQTT_PREFIX", "enocean"),
+        "discovery_prefix": os.getenv("MQTT_DISCOVERY_PREFIX", "homeassistant"),
+        "client_id": os.getenv("MQTT_CLIENT_ID", "enocean_gateway")
+    },
+    "enocean": {
+        "port": os.getenv("ENOCEAN_PORT", "")
+    },
+    "logging": {
+        "level": os.getenv("LOG_LEVEL", "info")
+    },
+}
+_STATUS_MQTT_HOST = os.getenv("MQTT_HOST", "not configured")
+_STATUS_ENOCEAN_PORT = os.getenv("ENOCEAN_PORT", "not configured")
+
+
 @router.get("/status")
 async def get_status(request: Request) -> Dict[str, Any]:
     """Get system status"""
@@ -56,12 +103,12 @@ async def get_status(request: Request) -> Dict[str, Any]:
     return {
         "mqtt": {
             "connected": mqtt_handler.is_connected if mqtt_handler else False,
-            "host": os.getenv("MQTT_HOST", "not configured"),
-            "prefix": os.getenv("MQTT_PREFIX", "enocean")
+            "host": _STATUS_MQTT_HOST,
+            "prefix": _CONFIG["mqtt"]["prefix"]
         },
         "enocean": {
             "connected": serial_handler.is_connected if serial_handler else False,
-            "port": os.getenv("ENOCEAN_PORT", "not configured")
+            "port": _STATUS_ENOCEAN_PORT
         },
         "devices": {
             "count": device_manager.device_count if device_manager else 0
@@ -77,19 +124,7 @@ async def get_status(request: Request) -> Dict[str, Any]:
 async def get_config(request: Request) -> Dict[str, Any]:
     """Get current configuration"""
     return {
-        "mqtt": {
-            "host": os.getenv("MQTT_HOST", ""),
-            "port": os.getenv("MQTT_PORT", "1883"),
-            "prefix": os.getenv("MQTT_PREFIX", "enocean"),
-            "discovery_prefix": os.getenv("MQTT_DISCOVERY_PREFIX", "homeassistant"),
-            "client_id": os.getenv("MQTT_CLIENT_ID", "enocean_gateway")
-        },
-        "enocean": {
-            "port": os.getenv("ENOCEAN_PORT", "")
-        },
-        "logging": {
-            "level": os.getenv("LOG_LEVEL", "info")
-        },
+        **_CONFIG,
         "paths": {
             "config": request.app.state.config_path
         }
@@ -107,67 +142,123 @@ async def get_logs(lines: int = 100, request: Request = None) -> Dict[str, Any]:
     }
 
 
+def _config_files(config_path: str):
+    """(path, name in the ZIP) of every configuration file that exists.
+
+    One scandir of the config directory answers which of them are there,
+    instead of an exists() per name.
+    """
+    try:
+        with os.scandir(config_path) as it:
+            present = {e.name: e.path for e in it if e.is_file()}
+    except FileNotFoundError:
+        return []
+
+    files = [(present[name], name) for name in _CONFIG_FILES_HEAD if name in present]
+    files += [(entry.path, f"custom_eep/{entry.name}") for entry in _custom_eep_files(config_path)]
+    files += [(present[name], name) for name in _CONFIG_FILES_TAIL if name in present]
+    return files
+
+
+def _export_metadata(request: Request) -> str:
+    """export_info.yaml, which restore and the backup list read back."""
+    device_manager = request.app.state.device_manager
+    eep_manager = request.app.state.eep_manager
+    metadata = {
+        "exported_at": datetime.now().isoformat(),
+        "version": VERSION,
+        "device_manager": device_manager.device_count if device_manager else 0,
+        "eep_manager": eep_manager.profile_count if eep_manager else 0
+    }
+    return yaml_io.dump(metadata)
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only stream that keeps what ZipFile wrote until it is drained.
+
+    It cannot seek, so ZipFile writes each member's sizes after its data
+    (data descriptors) instead of going back to patch the local header, which
+    is what lets the archive be sent while it is being built.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _iter_zip(files, metadata: str):
+    """Yield a ZIP of files plus export_info.yaml, one member at a time.
+
+    A plain generator: StreamingResponse runs it in the thread pool, so the
+    compression happens off the event loop, and only the member being
+    compressed is held in memory instead of the whole archive.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for path, arcname in files:
+            zf.write(path, arcname)
+            yield sink.drain()
+        zf.writestr("export_info.yaml", metadata)
+    yield sink.drain()
+
+
 @router.post("/export")
 async def export_all(request: Request):
     """Export all configuration as ZIP file"""
     config_path = request.app.state.config_path
 
-    # Create in-memory ZIP file
-    zip_buffer = io.BytesIO()
-
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        # Export devices
-        devices_file = os.path.join(config_path, "devices.yaml")
-        if os.path.exists(devices_file):
-            zf.write(devices_file, "devices.yaml")
-
-        # Export legacy devices format
-        legacy_devices = os.path.join(config_path, "enoceanmqtt.devices")
-        if os.path.exists(legacy_devices):
-            zf.write(legacy_devices, "enoceanmqtt.devices")
-
-        # Export mappings
-        mappings_file = os.path.join(config_path, "mapping.yaml")
-        if os.path.exists(mappings_file):
-            zf.write(mappings_file, "mapping.yaml")
-
-        # Export custom EEP profiles
-        custom_eep_path = os.path.join(config_path, "custom_eep")
-        if os.path.exists(custom_eep_path):
-            for filename in os.listdir(custom_eep_path):
-                if filename.endswith(".yaml"):
-                    filepath = os.path.join(custom_eep_path, filename)
-                    zf.write(filepath, f"custom_eep/{filename}")
-
-        # Export user EEP.xml if exists
-        user_eep = os.path.join(config_path, "EEP.xml")
-        if os.path.exists(user_eep):
-            zf.write(user_eep, "EEP.xml")
-
-        # Export mapping overrides
-        overrides_file = os.path.join(config_path, "mapping_overrides.yaml")
-        if os.path.exists(overrides_file):
-            zf.write(overrides_file, "mapping_overrides.yaml")
-
-        # Add export metadata
-        metadata = {
-            "exported_at": datetime.now().isoformat(),
-            "version": VERSION,
-            "device_manager": request.app.state.device_manager.device_count if request.app.state.device_manager else 0,
-            "eep_manager": request.app.state.eep_manager.profile_count if request.app.state.eep_manager else 0
-        }
-        zf.writestr("export_info.yaml", yaml.dump(metadata, default_flow_style=False, allow_unicode=True))
-
-    zip_buffer.seek(0)
-
     filename = f"enocean_config_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
     return StreamingResponse(
-        zip_buffer,
+        _iter_zip(_config_files(config_path), _export_metadata(request)),
         media_type="application/zip",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 
+def _extract_member_sync(zf: zipfile.ZipFile, name: str, dest: str):
+    """Copy one ZIP member to dest in chunks (worker thread).
+
+    zf.read() would hold the whole decompressed member in memory; EEP.xml
+    alone is several megabytes.
+    """
+    with zf.open(name) as src, open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 64 * 1024)
+
+
+# The full EEP.xml from the EnOcean Alliance is a few megabytes; anything far
+# beyond that is not one, and is refused before libxml2 builds a tree of it.
+_MAX_EEP_UPLOAD = 32 * 1024 * 1024
+
+
+def _store_eep_upload_sync(stream, eep_path: str) -> bool:
+    """Check an uploaded EEP.xml and copy it into place (worker thread).
+
+    Parses straight from Starlette's spooled upload file, so the upload is
+    never held as one bytes object next to its parsed tree, and neither the
+    parse nor the copy runs on the event loop. Returns False for well-formed
+    XML without <telegram> elements; XMLSyntaxError propagates.
+    """
+    stream.seek(0)
+    if etree.parse(stream).getroot().find(".//telegram") is None:
+        return False
+    stream.seek(0)
+    os.makedirs(os.path.dirname(eep_path), exist_ok=True)
+    file_io.write_atomic(eep_path, stream)
+    return True
+
+
 @router.post("/import")
 async def import_all(file: UploadFile = File(...), request: Request = None) -> Dict[str, Any]:
     """Import configuration from ZIP file"""
@@ -178,9 +269,6 @@ async def import_all(file: UploadFile = File(...), request: Request = None) -> D
     device_manager = request.app.state.device_manager
 
     try:
-        content = await file.read()
-        zip_buffer = io.BytesIO(content)
-
         imported = {
             "devices": False,
             "mappings": False,
@@ -189,7 +277,9 @@ async def import_all(file: UploadFile = File(...), request: Request = None) -> D
             "eep_xml": False
         }
 
-        with zipfile.ZipFile(zip_buffer, 'r') as zf:
+        # Starlette has already spooled the upload to a temporary file;
+        # ZipFile reads it from there instead of from a bytes copy of it.
+        with zipfile.ZipFile(file.file, 'r') as zf:
             for filename in zf.namelist():
                 if filename in ("devices.json", "devices.yaml"):
                     # Import devices (support both old JSON and new YAML)
@@ -197,11 +287,11 @@ async def import_all(file: UploadFile = File(...), request: Request = None) -> D
                     if filename.endswith(".json"):
                         devices_data = json.loads(raw)
                     else:
-                        devices_data = yaml.safe_load(raw) or {}
+                        devices_data = yaml_io.safe_load(raw) or {}
                     devices_file = os.path.join(config_path, "devices.yaml")
                     os.makedirs(config_path, exist_ok=True)
                     async with aiofiles.open(devices_file, 'w') as f:
-                        await f.write(yaml.dump(devices_data, default_flow_style=False, allow_unicode=True))
+                        await f.write(yaml_io.dump(devices_data))
                     imported["devices"] = True
 
                     # Reload devices
@@ -211,30 +301,24 @@ async def import_all(file: UploadFile = File(...), request: Request = None) -> D
 
                 elif filename == "mapping.yaml":
                     # Import mappings
-                    mappings_data = zf.read(filename)
                     mappings_file = os.path.join(config_path, "mapping.yaml")
                     os.makedirs(config_path, exist_ok=True)
-                    async with aiofiles.open(mappings_file, 'wb') as f:
-                        await f.write(mappings_data)
+                    await asyncio.to_thread(_extract_member_sync, zf, filename, mappings_file)
                     imported["mappings"] = True
 
                 elif filename.startswith("custom_eep/") and filename.endswith(".yaml"):
                     # Import custom profiles
-                    profile_data = zf.read(filename)
                     profile_name = os.path.basename(filename)
                     custom_path = os.path.join(config_path, "custom_eep")
                     os.makedirs(custom_path, exist_ok=True)
-                    async with aiofiles.open(os.path.join(custom_path, profile_name), 'wb') as f:
-                        await f.write(profile_data)
+                    await asyncio.to_thread(_extract_member_sync, zf, filename, os.path.join(custom_path, profile_name))
                     imported["custom_profiles"] += 1
 
                 elif filename == "EEP.xml":
                     # Import user EEP.xml
-                    eep_data = zf.read(filename)
                     eep_path = os.path.join(config_path, "EEP.xml")
                     os.makedirs(config_path, exist_ok=True)
-                    async with aiofiles.open(eep_path, 'wb') as f:
-                        await f.write(eep_data)
+                    await asyncio.to_thread(_extract_member_sync, zf, filename, eep_path)
                     imported["eep_xml"] = True
 
                 elif filename in ("mapping_overrides.json", "mapping_overrides.yaml"):
@@ -243,11 +327,11 @@ async def import_all(file: UploadFile = File(...), request: Request = None) -> D
                     if filename.endswith(".json"):
                         overrides_data = json.loads(raw)
                     else:
-                        overrides_data = yaml.safe_load(raw) or {}
+                        overrides_data = yaml_io.safe_load(raw) or {}
                     overrides_path = os.path.join(config_path, "mapping_overrides.yaml")
                     os.makedirs(config_path, exist_ok=True)
                     async with aiofiles.open(overrides_path, 'w') as f:
-                        await f.write(yaml.dump(overrides_data, default_flow_style=False, allow_unicode=True))
+                        await f.write(yaml_io.dump(overrides_data))
                     imported["mapping_overrides"] = True
 
         # Reinitialize EEP manager if any EEP-related data was imported
@@ -269,11 +353,8 @@ async def import_all(file: UploadFile = File(...), request: Request = None) -> D
 
 
 @router.get("/eep-info")
-async def get_eep_info(request: Request) -> Dict[str, Any]:
+async def get_eep_info(eep_manager: EEPManager = Depends(get_eep_manager)) -> Dict[str, Any]:
     """Get EEP.xml status information"""
-    eep_manager = request.app.state.eep_manager
-    if not eep_manager:
-        raise HTTPException(status_code=500, detail="EEP Manager not initialized")
     return eep_manager.get_eep_info()
 
 
@@ -287,23 +368,17 @@ async def upload_eep(file: UploadFile = File(...), request: Request = None) -> D
     eep_manager = request.app.state.eep_manager
 
     try:
-        content = await file.read()
+        if file.size is not None and file.size > _MAX_EEP_UPLOAD:
+            raise HTTPException(status_code=413, detail="File too large for an EEP.xml")
 
-        # Validate XML
+        # Validate XML (should have telegram elements) and save to config path
+        eep_path = os.path.join(config_path, "EEP.xml")
         try:
-            root = etree.fromstring(content)
-            # Basic structure check - should have telegram elements
-            telegrams = root.findall(".//telegram")
-            if not telegrams:
-                raise HTTPException(status_code=400, detail="Invalid EEP.xml: no telegram elements found")
+            stored = await asyncio.to_thread(_store_eep_upload_sync, file.file, eep_path)
         except etree.XMLSyntaxError as e:
             raise HTTPException(status_code=400, detail=f"Invalid XML: {e}")
-
-        # Save to config path
-        eep_path = os.path.join(config_path, "EEP.xml")
-        os.makedirs(config_path, exist_ok=True)
-        async with aiofiles.open(eep_path, 'wb') as f:
-            await f.write(content)
+        if not stored:
+            raise HTTPException(status_code=400, detail="Invalid EEP.xml: no telegram elements found")
 
         # Reload EEP profiles
         if eep_manager:
@@ -377,7 +452,7 @@ async def list_backups(request: Request):
         try:
             with zipfile.ZipFile(filepath, 'r') as zf:
                 if "export_info.yaml" in zf.namelist():
-                    meta = yaml.safe_load(zf.read("export_info.yaml"))
+                    meta = yaml_io.safe_load(zf.read("export_info.yaml"))
                     devices = meta.get("device_manager", 0)
                     version = meta.get("version", "?")
                 elif "export_info.json" in zf.namelist():
@@ -408,50 +483,10 @@ async def create_backup(request: Request) -> Dict[str, Any]:
     filename = f"backup_{timestamp}.zip"
     filepath = os.path.join(backup_dir, filename)
 
-    device_manager = request.app.state.device_manager
-    eep_manager = request.app.state.eep_manager
-
     with zipfile.ZipFile(filepath, 'w', zipfile.ZIP_DEFLATED) as zf:
-        # Devices
-        devices_file = os.path.join(config_path, "devices.yaml")
-        if os.path.exists(devices_file):
-            zf.write(devices_file, "devices.yaml")
-
-        # Legacy devices
-        legacy_devices = os.path.join(config_path, "enoceanmqtt.devices")
-        if os.path.exists(legacy_devices):
-            zf.write(legacy_devices, "enoceanmqtt.devices")
-
-        # Mappings
-        mappings_file = os.path.join(config_path, "mapping.yaml")
-        if os.path.exists(mappings_file):
-            zf.write(mappings_file, "mapping.yaml")
-
-        # Custom EEP profiles
-        custom_eep_path = os.path.join(config_path, "custom_eep")
-        if os.path.exists(custom_eep_path):
-            for fname in os.listdir(custom_eep_path):
-                if fname.endswith(".yaml"):
-                    zf.write(os.path.join(custom_eep_path, fname), f"custom_eep/{fname}")
-
-        # User EEP.xml
-        user_eep = os.path.join(config_path, "EEP.xml")
-        if os.path.exists(user_eep):
-            zf.write(user_eep, "EEP.xml")
-
-        # Mapping overrides
-        overrides_file = os.path.join(config_path, "mapping_overrides.yaml")
-        if os.path.exists(overrides_file):
-            zf.write(overrides_file, "mapping_overrides.yaml")
-
-        # Metadata
-        metadata = {
-            "exported_at": datetime.now().isoformat(),
-            "version": VERSION,
-            "device_manager": device_manager.device_count if device_manager else 0,
-            "eep_manager": eep_manager.profile_count if eep_manager else 0
-        }
-        zf.writestr("export_info.yaml", yaml.dump(metadata, default_flow_style=False, allow_unicode=True))
+        for path, arcname in _config_files(config_path):
+            zf.write(path, arcname)
+        zf.writestr("export_info.yaml", _export_metadata(request))
 
     return {"filename": filename, "status": "created"}
 
@@ -497,33 +532,27 @@ async def restore_backup(filename: str, request: Request) -> Dict[str, Any]:
                     if name.endswith(".json"):
                         devices_data = json.loads(raw)
                     else:
-                        devices_data = yaml.safe_load(raw) or {}
+                        devices_data = yaml_io.safe_load(raw) or {}
                     devices_file = os.path.join(config_path, "devices.yaml")
                     async with aiofiles.open(devices_file, 'w') as f:
-                        await f.write(yaml.dump(devices_data, default_flow_style=False, allow_unicode=True))
+                        await f.write(yaml_io.dump(devices_data))
                     imported["devices"] = True
                     if device_manager:
                         await device_manager.load_devices()
                         await _republish_after_restore(request)
 
                 elif name == "mapping.yaml":
-                    data = zf.read(name)
-                    async with aiofiles.open(os.path.join(config_path, "mapping.yaml"), 'wb') as f:
-                        await f.write(data)
+                    await asyncio.to_thread(_extract_member_sync, zf, name, os.path.join(config_path, "mapping.yaml"))
                     imported["mappings"] = True
 
                 elif name.startswith("custom_eep/") and name.endswith(".yaml"):
-                    data = zf.read(name)
                     custom_path = os.path.join(config_path, "custom_eep")
                     os.makedirs(custom_path, exist_ok=True)
-                    async with aiofiles.open(os.path.join(custom_path, os.path.basename(name)), 'wb') as f:
-                        await f.write(data)
+                    await asyncio.to_thread(_extract_member_sync, zf, name, os.path.join(custom_path, os.path.basename(name)))
                     imported["custom_profiles"] += 1
 
                 elif name == "EEP.xml":
-                    data = zf.read(name)
-                    async with aiofiles.open(os.path.join(config_path, "EEP.xml"), 'wb') as f:
-                        await f.write(data)
+                    await asyncio.to_thread(_extract_member_sync, zf, name, os.path.join(config_path, "EEP.xml"))
                     imported["eep_xml"] = True
 
                 elif name in ("mapping_overrides.json", "mapping_overrides.yaml"):
@@ -532,10 +561,10 @@ async def restore_backup(filename: str, request: Request) -> Dict[str, Any]:
                     if name.endswith(".json"):
                         overrides_data = json.loads(raw)
                     else:
-                        overrides_data = yaml.safe_load(raw) or {}
+                        overrides_data = yaml_io.safe_load(raw) or {}
                     overrides_path = os.path.join(config_path, "mapping_overrides.yaml")
                     async with aiofiles.open(overrides_path, 'w') as f:
-                        await f.write(yaml.dump(overrides_data, default_flow_style=False, allow_unicode=True))
+                        await f.write(yaml_io.dump(overrides_data))
                     imported["mapping_overrides"] = True
 
         # Reinitialize EEP manager if any EEP-related data was restored
@@ -674,7 +703,7 @@ def _write_options(data: Dict[str, Any]) -> None:
 @router.get("/mqtt-config")
 async def get_mqtt_config() -> Dict[str, Any]:
     """Get MQTT options as saved in /data/options.json (password masked)."""
-    options = _read_options()
+    options = await asyncio.to_thread(_read_options)
     mqtt = options.get("mqtt") or {}
 
     merged = dict(MQTT_DEFAULTS)
@@ -708,7 +737,9 @@ async def save_mqtt_config(payload: Dict[str, Any], request: Request) -> Dict[st
     reset = bool(payload.get("reset"))
     incoming = payload.get("mqtt") or {}
 
-    options = _read_options()
+    # options.json lives on /data, which is often an SD card: read and write
+    # it off the event loop like the other config files.
+    options = await asyncio.to_thread(_read_options)
     current = options.get("mqtt") or {}
 
     if reset:
@@ -741,7 +772,7 @@ async def save_mqtt_config(payload: Dict[str, Any], request: Request) -> Dict[st
 
     options["mqtt"] = new_mqtt
     try:
-        _write_options(options)
+        await asyncio.to_thread(_write_options, options)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to write options: {e}")
 
@@ -4,16 +4,54 @@ Device Manager - Handles device configuration storage and management
 
 import os
 import logging
-import configparser
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, field, asdict
+import asyncio
+import functools
+from typing import Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, field
 import aiofiles
-import yaml
 import json
 
+from . import file_io, yaml_io
+
 logger = logging.getLogger(__name__)
 
 
+def _address_key(address: str) -> Optional[int]:
+    """A device address ('0x05834FA4', '05834fa4') as the int it names.
+
+    None for an empty or malformed address, which then matches nothing.
+    """
+    try:
+        return int(address, 16)
+    except ValueError:
+        return None
+
+
+def _parse_ini_sections(text: str) -> Dict[str, Dict[str, str]]:
+    """Parse the flat INI format of enoceanmqtt.devices into {section: {key: value}}.
+
+    The file is only ever "[name]" headers and "key = value" lines, so this
+    replaces configparser and the interpolation, defaults and multi-line
+    values it would bring along. Keys are lower-cased like configparser does;
+    '#' and ';' lines are comments.
+    """
+    sections: Dict[str, Dict[str, str]] = {}
+    current = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line[0] in "#;":
+            continue
+        if line[0] == "[" and line[-1] == "]":
+            current = sections.setdefault(line[1:-1].strip(), {})
+        elif current is not None:
+            key, sep, value = line.partition("=")
+            if not sep:
+                key, sep, value = line.partition(":")
+            if sep:
+                current[key.strip().lower()] = value.strip()
+    return sections
+
+
 @dataclass
 class Device:
     """Represents an EnOcean device"""
@@ -35,21 +73,49 @@ class Device:
     # declare a perfectly healthy one dead. See issue #37 and ADR-0011.
     availability_timeout: int = 0
 
-    @property
+    # eep_id is read several times for every telegram the device sends, so
+    # both derived values are computed once and kept in the instance dict.
+    # Anything that changes rorg/func/type/address in place must call
+    # clear_cached() afterwards (DeviceManager.update_device does).
+    @functools.cached_property
     def eep_id(self) -> str:
         """Returns EEP identifier like A5-02-05"""
         return f"{self.rorg}-{self.func}-{self.type}"
 
-    @property
+    @functools.cached_property
     def address_int(self) -> int:
         """Returns address as integer"""
         if self.address.startswith("0x"):
             return int(self.address, 16)
         return int(self.address)
 
+    def clear_cached(self):
+        """Forget eep_id/address_int after fields were changed in place."""
+        self.__dict__.pop("eep_id", None)
+        self.__dict__.pop("address_int", None)
+
     def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary"""
-        return asdict(self)
+        """Convert to dictionary
+
+        Spelled out instead of dataclasses.asdict, which deep-copies every
+        value through a generic recursive walk; all fields here are plain
+        str/int/bool, so that bought nothing. Keep in step with the fields.
+        """
+        return {
+            "name": self.name,
+            "address": self.address,
+            "rorg": self.rorg,
+            "func": self.func,
+            "type": self.type,
+            "sender_id": self.sender_id,
+            "description": self.description,
+            "room": self.room,
+            "manufacturer": self.manufacturer,
+            "actuator_type": self.actuator_type,
+            "channel": self.channel,
+            "invert": self.invert,
+            "availability_timeout": self.availability_timeout,
+        }
 
     @classmethod
     def from_dict(cls, name: str, data: Dict[str, Any]) -> "Device":
@@ -83,7 +149,12 @@ class DeviceManager:
         self.legacy_devices_file = os.path.join(config_path, "enoceanmqtt.devices")
         # One address can hold several devices, a 2-channel actuator is
         # configured once per output, all sharing the module address (#24).
-        self._address_map: Dict[str, List[str]] = {}  # address -> [device_name]
+        # Keyed by the address as an int, the form the serial handler gets it
+        # in, so a telegram lookup needs no string formatting or parsing.
+        self._address_map: Dict[int, List[Device]] = {}  # address -> [device]
+        # (name.lower(), address.lower(), device), rebuilt with the address
+        # map, so a search does not lower-case every device per query.
+        self._search_keys: List[Tuple[str, str, Device]] = []
 
     @property
     def device_count(self) -> int:
@@ -91,12 +162,16 @@ class DeviceManager:
         return len(self.devices)
 
     def _rebuild_address_map(self):
-        """Rebuild address lookup map from current devices"""
+        """Rebuild address lookup map and search keys from current devices"""
         self._address_map = {}
-        for name, device in self.devices.items():
-            norm = device.address.strip().upper().replace("0X", "")
-            if norm:
-                self._address_map.setdefault(norm, []).append(name)
+        for device in self.devices.values():
+            key = _address_key(device.address)
+            if key is not None:
+                self._address_map.setdefault(key, []).append(device)
+        self._search_keys = [
+            (device.name.lower(), device.address.lower(), device)
+            for device in self.devices.values()
+        ]
 
     async def load_devices(self):
         """Load devices from configuration file"""
@@ -120,7 +195,7 @@ class DeviceManager:
         try:
             async with aiofiles.open(self.devices_file, 'r') as f:
                 content = await f.read()
-                data = yaml.safe_load(content) or {}
+                data = yaml_io.safe_load(content) or {}
 
                 for name, device_data in data.items():
                     self.devices[name] = Device.from_dict(name, device_data)
@@ -133,7 +208,9 @@ class DeviceManager:
     async def _load_json_devices(self):
         """Load devices from JSON file (legacy)"""
         try:
-            async with aiofiles.open(self.legacy_json_file, 'r') as f:
+            # Read as bytes: json.loads takes UTF-8 bytes directly, so the
+            # text layer's decode into a str first is skipped.
+            async with aiofiles.open(self.legacy_json_file, 'rb') as f:
                 content = await f.read()
                 data = json.loads(content)
 
@@ -148,23 +225,21 @@ class DeviceManager:
     async def _load_ini_devices(self):
         """Load devices from INI file (ChristopheHD format)"""
         try:
-            config = configparser.ConfigParser()
-            config.read(self.legacy_devices_file)
+            async with aiofiles.open(self.legacy_devices_file, 'r') as f:
+                sections = _parse_ini_sections(await f.read())
 
-            for section in config.sections():
+            for section, values in sections.items():
                 if section == "CONFIG":
                     continue
 
                 # Read sender (ChristopheHD uses "sender", we also support "sender_id" for backward compat)
-                sender = config.get(section, "sender", fallback="")
-                if not sender:
-                    sender = config.get(section, "sender_id", fallback="")
+                sender = values.get("sender") or values.get("sender_id", "")
 
                 device_data = {
-                    "address": config.get(section, "address", fallback=""),
-                    "rorg": self._format_hex(config.get(section, "rorg", fallback="")),
-                    "func": self._format_hex(config.get(section, "func", fallback="")),
-                    "type": self._format_hex(config.get(section, "type", fallback="")),
+                    "address": values.get("address", ""),
+                    "rorg": self._format_hex(values.get("rorg", "")),
+                    "func": self._format_hex(values.get("func", "")),
+                    "type": self._format_hex(values.get("type", "")),
                     "sender_id": sender,
                 }
 
@@ -195,8 +270,8 @@ class DeviceManager:
             # Save as YAML (current format)
             data = {name: device.to_dict() for name, device in self.devices.items()}
 
-            async with aiofiles.open(self.devices_file, 'w') as f:
-                await f.write(yaml.dump(data, default_flow_style=False, allow_unicode=True))
+            content = yaml_io.dump(data)
+            await asyncio.to_thread(file_io.write_atomic, self.devices_file, content)
 
             # Also save as INI for compatibility with enocean-mqtt
             await self._save_ini_devices()
@@ -210,19 +285,21 @@ class DeviceManager:
     async def _save_ini_devices(self):
         """Save devices in INI format for enocean-mqtt compatibility"""
         try:
-            lines = []
-            for name, device in self.devices.items():
-                lines.append(f"[{name}]")
-                lines.append(f"address = {device.address}")
-                lines.append(f"rorg = 0x{device.rorg}")
-                lines.append(f"func = 0x{device.func}")
-                lines.append(f"type = 0x{device.type}")
-                if device.sender_id:
-                    lines.append(f"sender = {device.sender_id}")
-                lines.append("")
-
-            async with aiofiles.open(self.legacy_devices_file, 'w') as f:
-                await f.write("\n".join(lines))
+            # One f-string per device instead of six list appends; the blocks
+            # are joined by a blank line, same output as before.
+            content = "\n".join(
+                f"[{name}]\n"
+                f"address = {device.address}\n"
+                f"rorg = 0x{device.rorg}\n"
+                f"func = 0x{device.func}\n"
+                f"type = 0x{device.type}\n"
+                + (f"sender = {device.sender_id}\n" if device.sender_id else "")
+                for name, device in self.devices.items()
+            )
+            # One thread hop for the whole write instead of aiofiles' hop per
+            # call, into a temp file that replaces the old one, so
+            # enocean-mqtt never reads a half-written file.
+            await asyncio.to_thread(file_io.write_atomic, self.legacy_devices_file, content)
 
         except Exception as e:
             logger.error(f"Failed to save INI devices: {e}")
@@ -233,8 +310,8 @@ class DeviceManager:
 
     def get_device_by_address(self, address: str) -> Optional[Device]:
         """Get the first device registered for an address (O(1) lookup)."""
-        devices = self.get_devices_by_address(address)
-        return devices[0] if devices else None
+        key = _address_key(address)
+        return None if key is None else self.get_device_by_id(key)
 
     def get_devices_by_address(self, address: str) -> List[Device]:
         """Get ALL devices registered for an address.
@@ -243,9 +320,17 @@ class DeviceManager:
         the same module address, every one of them has to receive the state
         of an incoming telegram, otherwise the second channel stays dead (#24).
         """
-        norm_addr = address.strip().upper().replace("0X", "")
-        names = self._address_map.get(norm_addr) or []
-        return [self.devices[n] for n in names if n in self.devices]
+        key = _address_key(address)
+        return [] if key is None else self.get_devices_by_id(key)
+
+    def get_device_by_id(self, address: int) -> Optional[Device]:
+        """get_device_by_address for an address already held as an int."""
+        devices = self._address_map.get(address)
+        return devices[0] if devices else None
+
+    def get_devices_by_id(self, address: int) -> List[Device]:
+        """get_devices_by_address for an address already held as an int."""
+        return list(self._address_map.get(address, ()))
 
     async def add_device(self, device: Device) -> bool:
         """Add a new device"""
@@ -259,20 +344,22 @@ class DeviceManager:
         logger.info(f"Added device: {device.name}")
         return True
 
-    async def update_device(self, name: str, device_data: Dict[str, Any]) -> bool:
-        """Update an existing device"""
-        if name not in self.devices:
-            return False
+    async def update_device(self, name: str, device_data: Dict[str, Any]) -> Optional[Device]:
+        """Update an existing device. Returns the updated device, or None if
+        there is no device by that name."""
+        device = self.devices.get(name)
+        if device is None:
+            return None
 
-        device = self.devices[name]
         for key, value in device_data.items():
             if hasattr(device, key):
                 setattr(device, key, value)
+        device.clear_cached()
 
         self._rebuild_address_map()
         await self.save_devices()
         logger.info(f"Updated device: {name}")
-        return True
+        return device
 
     async def rename_device(self, old_name: str, new_name: str) -> bool:
         """Rename a device (re-key). The name is the primary key and the MQTT
@@ -307,8 +394,7 @@ class DeviceManager:
     def search_devices(self, query: str) -> List[Device]:
         """Search devices by name or address"""
         query = query.lower()
-        results = []
-        for device in self.devices.values():
-            if query in device.name.lower() or query in device.address.lower():
-                results.append(device)
-        return results
+        return [
+            device for name, address, device in self._search_keys
+            if query in name or query in address
+        ]
@@ -7,19 +7,66 @@ The EEP.xml is bundled with the addon - no external downloads required.
 
 import os
 import json
+import asyncio
 import logging
+import functools
 from typing import Dict, List, Optional, Any
 from pathlib import Path
 from lxml import etree
-import yaml
-import aiofiles
+
+from . import file_io, yaml_io
 
 logger = logging.getLogger(__name__)
 
 
+def normalize_eep_part(value: str, width: int = 2) -> str:
+    """Normalize one RORG/FUNC/TYPE code as typed by a user.
+    e.g., '0xa5' -> 'A5', '2' -> '02'
+    """
+    value = value.upper()
+    if value.startswith("0X"):
+        value = value[2:]
+    return value.zfill(width)
+
+
+@functools.lru_cache(maxsize=512)
+def _xml_hex(value: str, width: int = 2) -> str:
+    """An EEP.xml hex attribute as an EEP ID part, e.g. '0x2' -> '02'.
+
+    EEP.xml repeats the same few dozen codes on every profile, so the
+    results are cached rather than rebuilt each time.
+    """
+    if value.startswith("0x"):
+        value = value[2:]
+    return value.upper().zfill(width)
+
+
+# Child lookups for _parse_profile_fields, compiled once. With these the
+# per-field lookups in EEP.xml run in about 60% of the time find()/findall()
+# take, which go through the ElementPath layer on every call.
+_XP_DATA = etree.XPath("data")
+_XP_ITEM = etree.XPath("item")
+_XP_RANGEITEM = etree.XPath("rangeitem")
+_XP_RANGE = etree.XPath("range")
+_XP_SCALE = etree.XPath("scale")
+_XP_MIN = etree.XPath("min")
+_XP_MAX = etree.XPath("max")
+
+
+def _first(xpath, element):
+    """First match of a compiled child path, or None, like find()."""
+    found = xpath(element)
+    return found[0] if found else None
+
+
 class EEPProfile:
     """Represents a single EEP profile"""
 
+    # One instance per profile, all kept for the add-on's lifetime: no
+    # per-instance __dict__, and faster attribute reads in the list/search
+    # paths that touch every profile.
+    __slots__ = ("rorg", "func", "type", "description", "fields", "ha_mapping", "is_custom")
+
     def __init__(self, rorg: str, func: str, type_: str, description: str = ""):
         self.rorg = rorg
         self.func = func
@@ -48,6 +95,24 @@ class EEPProfile:
         }
 
 
+# Basic profiles for common devices, loaded when EEP.xml cannot be. Built
+# once and shared: profiles are replaced in EEPManager.profiles, never
+# modified in place.
+_MINIMAL_PROFILES: Dict[str, EEPProfile] = {
+    profile.eep_id: profile
+    for profile in (
+        EEPProfile("A5", "02", "05", "Temperature Sensor 0°C to +40°C"),
+        EEPProfile("A5", "04", "01", "Temperature and Humidity Sensor"),
+        EEPProfile("A5", "07", "01", "Occupancy Sensor"),
+        EEPProfile("A5", "30", "03", "Digital Input (4 channels)"),
+        EEPProfile("D5", "00", "01", "Single Input Contact"),
+        EEPProfile("F6", "02", "01", "Rocker Switch, 2 Rockers"),
+        EEPProfile("D2", "01", "0F", "Electronic Switch"),
+        EEPProfile("D2", "05", "00", "Blinds Control"),
+    )
+}
+
+
 class EEPManager:
     """Manages EEP profiles from official XML and custom overrides"""
 
@@ -55,8 +120,15 @@ class EEPManager:
         self.config_path = config_path
         self.custom_eep_path = os.path.join(config_path, "custom_eep")
         self.profiles: Dict[str, EEPProfile] = {}
-        self._xml_root = None
         self._override_cache: Dict[str, Any] = {}
+        # Bumped whenever profiles or mapping overrides change, so views
+        # derived from them (the profile tree in the API) can be cached and
+        # rebuilt only when this moves.
+        self.version = 0
+        # Lookup indexes built from self.profiles, see _profile_indexes
+        self._index_version = -1
+        self._by_rorg: Dict[str, List[EEPProfile]] = {}
+        self._search_keys: List[tuple] = []
 
     @property
     def profile_count(self) -> int:
@@ -100,6 +172,7 @@ class EEPManager:
         # Load mapping overrides into sync cache (used by mapping_manager)
         await self._load_overrides()
 
+        self.version += 1
         logger.info(f"EEP Manager initialized with {self.profile_count} profiles")
 
     async def _load_base_eep(self):
@@ -114,71 +187,96 @@ class EEPManager:
         # User-provided EEP.xml (optional override in config)
         user_eep = os.path.join(self.config_path, "EEP.xml")
 
-        xml_content = None
+        source = None
 
         # Try user-provided EEP.xml first (allows updates without addon rebuild)
         if os.path.exists(user_eep):
             logger.info(f"Loading user EEP.xml from: {user_eep}")
-            async with aiofiles.open(user_eep, 'rb') as f:
-                xml_content = await f.read()
+            source = user_eep
 
         # Use bundled version (default)
         elif os.path.exists(bundled_eep):
             logger.info(f"Loading bundled EEP.xml: {bundled_eep}")
-            async with aiofiles.open(bundled_eep, 'rb') as f:
-                xml_content = await f.read()
+            source = bundled_eep
 
         else:
             logger.error(f"CRITICAL: Bundled EEP.xml not found at {bundled_eep}")
 
-        if xml_content:
-            await self._parse_eep_xml(xml_content)
-        else:
+        if not source or not await self._parse_eep_xml(source):
             logger.warning("No EEP.xml found - using built-in minimal profiles")
             self._load_minimal_profiles()
 
-    async def _parse_eep_xml(self, xml_content: bytes):
-        """Parse EEP.xml content and extract profiles"""
-        try:
-            self._xml_root = etree.fromstring(xml_content)
-
-            # Navigate the EEP.xml structure
-            # Structure: telegrams -> telegram (rorg) -> profiles (func) -> profile (type)
-            for telegram in self._xml_root.findall(".//telegram"):
-                rorg = telegram.get("rorg", "")
-                rorg_type = telegram.get("type", "")
+    async def _parse_eep_xml(self, path: str) -> bool:
+        """Parse EEP.xml and extract profiles
 
-                for profiles in telegram.findall("profiles"):
-                    func = profiles.get("func", "")
-                    func_desc = profiles.get("description", "")
+        Returns False if the file is empty, True otherwise (a file that fails
+        to parse is logged, not retried with the minimal profiles).
+        """
+        try:
+            if not os.path.getsize(path):
+                return False
+            # In a worker thread: an import re-runs this while the add-on is
+            # serving, and the event loop should not stall for the parse.
+            profiles = await asyncio.to_thread(self._parse_eep_xml_sync, path)
+            self.profiles.update(profiles)
+            logger.info(f"Parsed {len(profiles)} profiles from EEP.xml")
 
-                    for profile in profiles.findall("profile"):
-                        type_ = profile.get("type", "")
-                        type_desc = profile.get("description", func_desc)
+        except Exception as e:
+            logger.error(f"Failed to parse EEP.xml: {e}")
+        return True
+
+    def _parse_eep_xml_sync(self, path: str) -> Dict[str, "EEPProfile"]:
+        """Stream-parse EEP.xml into {eep_id: EEPProfile}.
+
+        Structure: telegrams -> telegram (rorg) -> profiles (func) -> profile (type).
+        iterparse hands over each <profile> as soon as it is complete; its
+        RORG and FUNC come from the enclosing elements, whose attributes are
+        already there. The profile is cleared and dropped from the tree once
+        parsed, so the whole document is never held as a tree at once. The
+        file is handed to iterparse by path, so libxml2 reads it in chunks and
+        the raw XML is never held in one bytes object either.
+        """
+        profiles = {}
+        for _, profile in etree.iterparse(path, events=("end",), tag="profile"):
+            group = profile.getparent()
+            telegram = group.getparent() if group is not None else None
+            if group is None or group.tag != "profiles" or telegram is None or telegram.tag != "telegram":
+                continue
 
-                        # Format RORG, FUNC, TYPE as hex strings like "A5", "02", "05"
-                        rorg_fmt = rorg.replace("0x", "").upper() if rorg.startswith("0x") else rorg.upper()
-                        func_fmt = func.replace("0x", "").upper().zfill(2) if func else "00"
-                        type_fmt = type_.replace("0x", "").upper().zfill(2) if type_ else "00"
+            rorg = telegram.get("rorg", "")
+            func = group.get("func", "")
+            type_ = profile.get("type", "")
+            type_desc = profile.get("description", group.get("description", ""))
 
-                        eep_profile = EEPProfile(rorg_fmt, func_fmt, type_fmt, type_desc)
+            # Format RORG, FUNC, TYPE as hex strings like "A5", "02", "05"
+            # (RORG is not zero-padded)
+            eep_profile = EEPProfile(_xml_hex(rorg, 0), _xml_hex(func), _xml_hex(type_), type_desc)
 
-                        # Parse data fields
-                        eep_profile.fields = self._parse_profile_fields(profile)
+            # Parse data fields
+            eep_profile.fields = self._parse_profile_fields(profile)
 
-                        self.profiles[eep_profile.eep_id] = eep_profile
+            profiles[eep_profile.eep_id] = eep_profile
 
-            logger.info(f"Parsed {len(self.profiles)} profiles from EEP.xml")
+            # Drop everything already handled: earlier profiles of this group,
+            # and the (by now empty) earlier groups and telegrams above it.
+            profile.clear(keep_tail=True)
+            while profile.getprevious() is not None:
+                del group[0]
+            while group.getprevious() is not None:
+                del telegram[0]
+            root = telegram.getparent()
+            if root is not None:
+                while telegram.getprevious() is not None:
+                    del root[0]
 
-        except Exception as e:
-            logger.error(f"Failed to parse EEP.xml: {e}")
+        return profiles
 
     def _parse_profile_fields(self, profile_element) -> List[Dict[str, Any]]:
         """Parse data fields from a profile element"""
         fields = []
 
         # Support multiple <data> elements (some profiles have data command="1", command="2", etc.)
-        data_elements = profile_element.findall("data")
+        data_elements = _XP_DATA(profile_element)
         if not data_elements:
             return fields
 
@@ -203,13 +301,13 @@ class EEPManager:
                 # Parse enum values
                 if field.tag == "enum":
                     field_info["values"] = []
-                    for item in field.findall("item"):
+                    for item in _XP_ITEM(field):
                         field_info["values"].append({
                             "value": item.get("value", ""),
                             "description": item.get("description", "")
                         })
                     # Also parse range items (e.g., "3-127: reserved")
-                    for rangeitem in field.findall("rangeitem"):
+                    for rangeitem in _XP_RANGEITEM(field):
                         field_info["values"].append({
                             "start": rangeitem.get("start", ""),
                             "end": rangeitem.get("end", ""),
@@ -220,23 +318,23 @@ class EEPManager:
                 # Parse value ranges (child elements, not attributes!)
                 elif field.tag == "value":
                     field_info["unit"] = field.get("unit", "")
-                    range_elem = field.find("range")
+                    range_elem = _first(_XP_RANGE, field)
                     if range_elem is not None:
-                        min_el = range_elem.find("min")
-                        max_el = range_elem.find("max")
+                        min_el = _first(_XP_MIN, range_elem)
+                        max_el = _first(_XP_MAX, range_elem)
                         field_info["min"] = float(min_el.text) if min_el is not None and min_el.text else 0
                         field_info["max"] = float(max_el.text) if max_el is not None and max_el.text else 255
-                    scale_elem = field.find("scale")
+                    scale_elem = _first(_XP_SCALE, field)
                     if scale_elem is not None:
-                        min_el = scale_elem.find("min")
-                        max_el = scale_elem.find("max")
+                        min_el = _first(_XP_MIN, scale_elem)
+                        max_el = _first(_XP_MAX, scale_elem)
                         field_info["scale_min"] = float(min_el.text) if min_el is not None and min_el.text else 0
                         field_info["scale_max"] = float(max_el.text) if max_el is not None and max_el.text else 255
 
                 # Parse command fields (similar to enum)
                 elif field.tag == "command":
                     field_info["values"] = []
-                    for item in field.findall("item"):
+                    for item in _XP_ITEM(field):
                         field_info["values"].append({
                             "value": item.get("value", ""),
                             "description": item.get("description", "")
@@ -248,21 +346,7 @@ class EEPManager:
 
     def _load_minimal_profiles(self):
         """Load minimal built-in profiles as fallback"""
-        # Basic profiles for common devices
-        minimal = [
-            ("A5", "02", "05", "Temperature Sensor 0°C to +40°C"),
-            ("A5", "04", "01", "Temperature and Humidity Sensor"),
-            ("A5", "07", "01", "Occupancy Sensor"),
-            ("A5", "30", "03", "Digital Input (4 channels)"),
-            ("D5", "00", "01", "Single Input Contact"),
-            ("F6", "02", "01", "Rocker Switch, 2 Rockers"),
-            ("D2", "01", "0F", "Electronic Switch"),
-            ("D2", "05", "00", "Blinds Control"),
-        ]
-
-        for rorg, func, type_, desc in minimal:
-            profile = EEPProfile(rorg, func, type_, desc)
-            self.profiles[profile.eep_id] = profile
+        self.profiles.update(_MINIMAL_PROFILES)
 
     @staticmethod
     def _profile_content_hash(data: dict) -> str:
@@ -289,6 +373,13 @@ class EEPManager:
         if not os.path.exists(bundled_path):
             return
 
+        # All of it in one worker-thread pass, like _read_custom_profiles_sync:
+        # the YAML parsing and hashing stay off the event loop, and there is
+        # one thread hop for the directory instead of up to three per file.
+        await asyncio.to_thread(self._seed_bundled_profiles_sync, bundled_path)
+
+    def _seed_bundled_profiles_sync(self, bundled_path: str):
+        """The work of _seed_bundled_profiles (worker thread)."""
         os.makedirs(self.custom_eep_path, exist_ok=True)
 
         for filename in os.listdir(bundled_path):
@@ -297,9 +388,8 @@ class EEPManager:
 
             bundled_file = os.path.join(bundled_path, filename)
             try:
-                async with aiofiles.open(bundled_file, 'r') as f:
-                    bundled_content = await f.read()
-                    bundled_data = yaml.safe_load(bundled_content)
+                bundled_content = Path(bundled_file).read_text(encoding="utf-8")
+                bundled_data = yaml_io.safe_load(bundled_content)
 
                 if not bundled_data or "profile" not in bundled_data:
                     continue
@@ -316,9 +406,8 @@ class EEPManager:
 
                 if os.path.exists(target_file):
                     # Check if bundled profile differs from existing
-                    async with aiofiles.open(target_file, 'r') as f:
-                        existing_content = await f.read()
-                        existing_data = yaml.safe_load(existing_content)
+                    existing_content = Path(target_file).read_text(encoding="utf-8")
+                    existing_data = yaml_io.safe_load(existing_content)
 
                     bundled_hash = self._profile_content_hash(bundled_data)
                     existing_hash = self._profile_content_hash(existing_data)
@@ -336,49 +425,65 @@ class EEPManager:
                     should_copy = True
 
                 if should_copy:
-                    async with aiofiles.open(target_file, 'w') as f:
-                        await f.write(bundled_content)
+                    Path(target_file).write_text(bundled_content, encoding="utf-8")
 
             except Exception as e:
                 logger.error(f"Failed to seed bundled profile {filename}: {e}")
 
+    def _read_custom_profiles_sync(self) -> List[tuple]:
+        """Read and parse every custom profile file (worker thread).
+
+        Returns (filename, parsed YAML) pairs, with the exception in place of
+        the data for a file that could not be read or parsed. One thread hop
+        for the whole directory instead of one per file, and the YAML parsing
+        happens off the event loop too.
+        """
+        with os.scandir(self.custom_eep_path) as it:
+            entries = [e for e in it if e.name.endswith((".yaml", ".yml"))]
+
+        results = []
+        for entry in entries:
+            try:
+                with open(entry.path, 'rb') as f:
+                    results.append((entry.name, yaml_io.safe_load(f)))
+            except Exception as e:
+                results.append((entry.name, e))
+        return results
+
     async def _load_custom_profiles(self):
         """Load custom EEP profile overrides from persistent storage"""
         if not os.path.exists(self.custom_eep_path):
             os.makedirs(self.custom_eep_path, exist_ok=True)
             return
 
-        for filename in os.listdir(self.custom_eep_path):
-            if filename.endswith(".yaml") or filename.endswith(".yml"):
-                filepath = os.path.join(self.custom_eep_path, filename)
-                try:
-                    async with aiofiles.open(filepath, 'r') as f:
-                        content = await f.read()
-                        data = yaml.safe_load(content)
-
-                        if data and "profile" in data:
-                            profile_data = data["profile"]
-                            rorg = profile_data.get("rorg", "").upper()
-                            func = profile_data.get("func", "").upper().zfill(2)
-                            type_ = profile_data.get("type", "").upper().zfill(2)
-                            desc = profile_data.get("description", "Custom Profile")
-
-                            profile = EEPProfile(rorg, func, type_, desc)
-                            profile.fields = profile_data.get("fields", [])
-                            profile.is_custom = True
-
-                            # Load HA mapping if present (either in profile or top-level)
-                            ha_mapping = data.get("ha_mapping", {})
-                            if not ha_mapping:
-                                ha_mapping = profile_data.get("ha_mapping", {})
-                            profile.ha_mapping = ha_mapping
-
-                            self.profiles[profile.eep_id] = profile
-                            logger.info(f"Loaded custom profile: {profile.eep_id}"
-                                        f"{' with ha_mapping' if ha_mapping else ''}")
-
-                except Exception as e:
-                    logger.error(f"Failed to load custom profile {filename}: {e}")
+        for filename, data in await asyncio.to_thread(self._read_custom_profiles_sync):
+            try:
+                if isinstance(data, Exception):
+                    raise data
+
+                if data and "profile" in data:
+                    profile_data = data["profile"]
+                    rorg = profile_data.get("rorg", "").upper()
+                    func = profile_data.get("func", "").upper().zfill(2)
+                    type_ = profile_data.get("type", "").upper().zfill(2)
+                    desc = profile_data.get("description", "Custom Profile")
+
+                    profile = EEPProfile(rorg, func, type_, desc)
+                    profile.fields = profile_data.get("fields", [])
+                    profile.is_custom = True
+
+                    # Load HA mapping if present (either in profile or top-level)
+                    ha_mapping = data.get("ha_mapping", {})
+                    if not ha_mapping:
+                        ha_mapping = profile_data.get("ha_mapping", {})
+                    profile.ha_mapping = ha_mapping
+
+                    self.profiles[profile.eep_id] = profile
+                    logger.info(f"Loaded custom profile: {profile.eep_id}"
+                                f"{' with ha_mapping' if ha_mapping else ''}")
+
+            except Exception as e:
+                logger.error(f"Failed to load custom profile {filename}: {e}")
 
     def get_profile(self, eep_id: str) -> Optional[EEPProfile]:
         """Get a profile by EEP ID"""
@@ -389,14 +494,33 @@ class EEPManager:
         eep_id = f"{rorg.upper()}-{func.upper().zfill(2)}-{type_.upper().zfill(2)}"
         return self.profiles.get(eep_id)
 
+    def _profile_indexes(self):
+        """(profiles by RORG, lower-cased search keys), rebuilt after a change.
+
+        Keyed on self.version like the API's cached tree: every path that
+        adds or removes profiles ends by bumping it, so the indexes are
+        rebuilt on the first query after a change instead of at each of the
+        places that insert profiles.
+        """
+        if self._index_version != self.version:
+            by_rorg: Dict[str, List[EEPProfile]] = {}
+            search_keys = []
+            for profile in self.profiles.values():
+                by_rorg.setdefault(profile.rorg, []).append(profile)
+                search_keys.append((profile.eep_id.lower(), profile.description.lower(), profile))
+            self._by_rorg = by_rorg
+            self._search_keys = search_keys
+            self._index_version = self.version
+        return self._by_rorg, self._search_keys
+
     def search_profiles(self, query: str) -> List[EEPProfile]:
         """Search profiles by description or EEP ID"""
         query = query.lower()
-        results = []
-        for profile in self.profiles.values():
-            if query in profile.eep_id.lower() or query in profile.description.lower():
-                results.append(profile)
-        return results
+        _, search_keys = self._profile_indexes()
+        return [
+            profile for eep_id, description, profile in search_keys
+            if query in eep_id or query in description
+        ]
 
     def get_all_profiles(self) -> List[Dict[str, Any]]:
         """Get all profiles as dictionaries"""
@@ -404,8 +528,8 @@ class EEPManager:
 
     def get_profiles_by_rorg(self, rorg: str) -> List[EEPProfile]:
         """Get all profiles for a specific RORG"""
-        rorg = rorg.upper()
-        return [p for p in self.profiles.values() if p.rorg == rorg]
+        by_rorg, _ = self._profile_indexes()
+        return list(by_rorg.get(rorg.upper(), ()))
 
     async def save_custom_profile(self, profile_data: Dict[str, Any],
                                    ha_mapping: Optional[Dict[str, Dict[str, Any]]] = None) -> bool:
@@ -425,8 +549,7 @@ class EEPManager:
             if ha_mapping:
                 save_data["ha_mapping"] = ha_mapping
 
-            async with aiofiles.open(filepath, 'w') as f:
-                await f.write(yaml.dump(save_data, default_flow_style=False, allow_unicode=True))
+            await file_io.write_text(filepath, yaml_io.dump(save_data))
 
             # Reload the profile
             profile = EEPProfile(rorg, func, type_, profile_data.get("description", ""))
@@ -434,6 +557,7 @@ class EEPManager:
             profile.ha_mapping = ha_mapping or {}
             profile.is_custom = True
             self.profiles[profile.eep_id] = profile
+            self.version += 1
 
             logger.info(f"Saved custom profile: {profile.eep_id}"
                         f"{' with ha_mapping' if ha_mapping else ''}")
@@ -457,6 +581,7 @@ class EEPManager:
                 os.remove(filepath)
 
             del self.profiles[eep_id.upper()]
+            self.version += 1
             logger.info(f"Deleted custom profile: {eep_id}")
             return True
 
@@ -479,11 +604,9 @@ class EEPManager:
         # One-time migration from JSON to YAML
         if not os.path.exists(path) and os.path.exists(legacy_path):
             try:
-                async with aiofiles.open(legacy_path, 'r') as f:
-                    data = json.loads(await f.read())
+                data = json.loads(await file_io.read_bytes(legacy_path))
                 await self._save_overrides(data)
                 logger.info("Migrated mapping_overrides.json -> mapping_overrides.yaml")
-                self._override_cache = data
                 return data
             except Exception:
                 return {}
@@ -491,18 +614,27 @@ class EEPManager:
         if not os.path.exists(path):
             return {}
         try:
-            async with aiofiles.open(path, 'r') as f:
-                data = yaml.safe_load(await f.read()) or {}
-                self._override_cache = data
-                return data
+            data = yaml_io.safe_load(await file_io.read_text(path)) or {}
+            self._set_override_cache(data)
+            return data
         except Exception:
             return {}
 
     async def _save_overrides(self, overrides: Dict[str, Any]):
         path = self._overrides_file()
         os.makedirs(os.path.dirname(path), exist_ok=True)
-        async with aiofiles.open(path, 'w') as f:
-            await f.write(yaml.dump(overrides, default_flow_style=False, allow_unicode=True))
+        await file_io.write_text(path, yaml_io.dump(overrides))
+        # Callers edit the dict _load_overrides returned, which is the cache
+        # itself, so a save always counts as a change.
+        self._override_cache = overrides
+        self.version += 1
+
+    def _set_override_cache(self, overrides: Dict[str, Any]):
+        # _load_overrides runs on every override lookup, so only a real
+        # change may bump the version - otherwise each profile view would
+        # throw the cached tree away.
+        if overrides != self._override_cache:
+            self.version += 1
         self._override_cache = overrides
 
     def get_mapping_override_sync(self, eep_id: str) -> Optional[Dict[str, Any]]:
@@ -543,3 +675,7 @@ class EEPManager:
     async def get_all_mapping_overrides(self) -> Dict[str, Any]:
         """Get all mapping overrides"""
         return await self._load_overrides()
+
+    def get_all_mapping_overrides_sync(self) -> Dict[str, Any]:
+        """Get all mapping overrides from the in-memory cache"""
+        return self._override_cache
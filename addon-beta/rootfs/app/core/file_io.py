@@ -0,0 +1,51 @@
+"""
+File helpers - whole-file reads and writes off the event loop
+
+The files the managers load and save (EEP.xml, profiles, mappings) are read
+and written in one piece. aiofiles hands every open, read, write and close to
+the thread pool separately, which for files of a few kilobytes costs more than
+the I/O itself; these do the whole job in a single worker-thread hop.
+
+write_atomic is the shared way to replace a file in /data without ever
+leaving a truncated one behind.
+"""
+
+import asyncio
+import os
+import shutil
+from pathlib import Path
+
+
+async def read_bytes(path: str) -> bytes:
+    """Read a whole file as bytes."""
+    return await asyncio.to_thread(Path(path).read_bytes)
+
+
+async def read_text(path: str) -> str:
+    """Read a whole UTF-8 text file."""
+    return await asyncio.to_thread(Path(path).read_text, encoding="utf-8")
+
+
+async def write_text(path: str, text: str):
+    """Replace a file's content with UTF-8 text."""
+    await asyncio.to_thread(Path(path).write_text, text, encoding="utf-8")
+
+
+def write_atomic(path: str, content):
+    """Replace path with content: str (UTF-8), bytes or a binary file object.
+
+    Written to path.tmp, fsync()ed, then renamed over path, so a crash, a
+    full disk or a power cut mid-write leaves the previous file instead of a
+    truncated one. Blocking, run it in a worker thread.
+    """
+    tmp_path = f"{path}.tmp"
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    with open(tmp_path, "wb") as f:
+        if isinstance(content, (bytes, bytearray)):
+            f.write(content)
+        else:
+            shutil.copyfileobj(content, f, 64 * 1024)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
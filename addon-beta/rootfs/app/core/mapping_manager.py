@@ -11,10 +11,13 @@ With sender: enocean_{EEP}_{ADDR}_{SENDER}_{SHORTCUT}
 """
 
 import os
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any
-import yaml
-import aiofiles
+import functools
+from collections import ChainMap
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Any
+from . import file_io, yaml_io
 
 logger = logging.getLogger(__name__)
 
@@ -945,6 +948,18 @@ DEFAULT_MAPPINGS = {
     },
 }
 
+# The defaults are shared by every device and handed out by get_mapping as
+# they are, so they are made read-only down to the field level: nothing can
+# change them for everyone by accident, and nothing needs to copy them.
+DEFAULT_MAPPINGS = MappingProxyType({
+    eep_id: MappingProxyType({
+        field: MappingProxyType(field_config)
+        for field, field_config in mapping.items()
+    })
+    for eep_id, mapping in DEFAULT_MAPPINGS.items()
+})
+
+
 def _normalize_address(address: str) -> str:
     """Normalize address to 8-char lowercase hex without 0x prefix.
     e.g., '0x05834FA4' -> '05834fa4'
@@ -963,6 +978,54 @@ def _normalize_eep(eep_id: str) -> str:
     return eep_id.lower().replace("-", "")
 
 
+# Mapping keys get_ha_discovery_configs handles itself instead of passing
+# them through to the discovery config.
+_INTERNAL_KEYS = frozenset({"component", "name", "value_template"})
+# Components that get a command topic
+_CONTROLLABLE_COMPONENTS = frozenset({"switch", "light", "cover", "climate", "fan"})
+
+
+def _unique_id_prefix(eep_id: str, address: str, sender: str) -> str:
+    """Everything of a unique ID but the shortcut (see build_unique_id)."""
+    eep = _normalize_eep(eep_id)
+    addr = _normalize_address(address)
+    if sender:
+        return f"enocean_{eep}_{addr}_{_normalize_address(sender)}"
+    return f"enocean_{eep}_{addr}"
+
+
+def _dump_yaml_sync(path: str, data: Dict[str, Any]):
+    """Dump data as YAML and replace path with it (worker thread)."""
+    file_io.write_atomic(path, yaml_io.dump(data))
+
+
+# Upper bound on MappingManager's discovery cache, far above any real install
+_DISCOVERY_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=1024)
+def _object_id_part(name: str) -> str:
+    """A device or field name as it appears in an object_id.
+
+    The same few field shortcuts (TMP, HUM, ...) and device names come up
+    on every discovery publish, so the results are cached.
+    """
+    return name.lower().replace(" ", "_")
+
+
+@functools.lru_cache(maxsize=None)
+def _gateway_availability(mqtt_prefix: str) -> Dict[str, str]:
+    """The add-on's own availability entry, one shared dict per prefix.
+
+    It depends on nothing but the prefix, and is only ever serialized.
+    """
+    return {
+        "topic": f"{mqtt_prefix}/__system/status",
+        "payload_available": "online",
+        "payload_not_available": "offline",
+    }
+
+
 class MappingManager:
     """Manages EEP to MQTT/HA entity mappings"""
 
@@ -971,6 +1034,19 @@ class MappingManager:
         self.eep_manager = eep_manager
         self.mappings_file = os.path.join(config_path, "mapping.yaml")
         self.custom_mappings: Dict[str, Dict[str, Any]] = {}
+        # Custom mappings over the defaults, one lookup for get_mapping.
+        # Rebuilt by _rebuild_effective whenever custom_mappings changes.
+        self._effective: Dict[str, Mapping[str, Any]] = dict(DEFAULT_MAPPINGS)
+        # get_ha_discovery_configs results by their arguments, valid for one
+        # EEPManager.version (see get_ha_discovery_configs)
+        self._discovery_cache: Dict[tuple, List[Dict[str, Any]]] = {}
+        self._discovery_cache_version = None
+        self.discovery_cache_hits = 0
+        self.discovery_cache_misses = 0
+        # The device-independent part of each mapping field's entity config,
+        # per EEP (see _field_templates). Emptied together with
+        # _discovery_cache.
+        self._field_template_cache: Dict[str, List[tuple]] = {}
 
     async def initialize(self):
         """Initialize mapping manager - load custom mappings"""
@@ -983,30 +1059,32 @@ class MappingManager:
             return
 
         try:
-            async with aiofiles.open(self.mappings_file, 'r') as f:
-                content = await f.read()
-                data = yaml.safe_load(content)
-                if data and isinstance(data, dict):
-                    self.custom_mappings = data
-                    logger.info(f"Loaded {len(self.custom_mappings)} custom mappings")
+            data = yaml_io.safe_load(await file_io.read_bytes(self.mappings_file))
+            if data and isinstance(data, dict):
+                self.custom_mappings = data
+                self._rebuild_effective()
+                logger.info(f"Loaded {len(self.custom_mappings)} custom mappings")
         except Exception as e:
             logger.error(f"Failed to load custom mappings: {e}")
 
+    def _rebuild_effective(self):
+        """Merge the custom mappings over the defaults for get_mapping"""
+        self._effective = {**DEFAULT_MAPPINGS, **self.custom_mappings}
+        self._discovery_cache.clear()
+        self._field_template_cache.clear()
+
     async def save_mappings(self):
         """Save custom mappings to file"""
         try:
             os.makedirs(self.config_path, exist_ok=True)
-            async with aiofiles.open(self.mappings_file, 'w') as f:
-                await f.write(yaml.dump(
-                    self.custom_mappings,
-                    default_flow_style=False,
-                    allow_unicode=True
-                ))
+            # A shallow copy: set_mapping/delete_mapping may change the dict
+            # while the worker thread is still dumping it.
+            await asyncio.to_thread(_dump_yaml_sync, self.mappings_file, dict(self.custom_mappings))
             logger.info("Saved custom mappings")
         except Exception as e:
             logger.error(f"Failed to save mappings: {e}")
 
-    def get_mapping(self, eep_id: str) -> Dict[str, Any]:
+    def get_mapping(self, eep_id: str) -> Mapping[str, Any]:
         """Get mapping for a device
 
         Priority:
@@ -1032,20 +1110,15 @@ class MappingManager:
                 logger.debug(f"Using mapping override for {eep_id}")
                 return override
 
-        # 3. Custom mappings from mapping.yaml
-        if eep_id in self.custom_mappings:
-            return self.custom_mappings[eep_id]
-
-        # 4. Default mappings
-        if eep_id in DEFAULT_MAPPINGS:
-            return DEFAULT_MAPPINGS[eep_id]
-
-        return {}
+        # 3. Custom mappings from mapping.yaml, 4. Default mappings
+        # (merged in _effective, custom first)
+        return self._effective.get(eep_id, {})
 
     async def set_mapping(self, eep_id: str, mapping: Dict[str, Any]):
         """Set custom mapping for an EEP profile"""
         eep_id = eep_id.upper()
         self.custom_mappings[eep_id] = mapping
+        self._rebuild_effective()
         await self.save_mappings()
         logger.info(f"Set mapping for {eep_id}")
 
@@ -1054,16 +1127,19 @@ class MappingManager:
         eep_id = eep_id.upper()
         if eep_id in self.custom_mappings:
             del self.custom_mappings[eep_id]
+            self._rebuild_effective()
             await self.save_mappings()
             logger.info(f"Deleted mapping for {eep_id}")
             return True
         return False
 
-    def get_all_mappings(self) -> Dict[str, Dict[str, Any]]:
-        """Get all mappings (merged default + custom)"""
-        result = dict(DEFAULT_MAPPINGS)
-        result.update(self.custom_mappings)
-        return result
+    def get_all_mappings(self) -> Mapping[str, Mapping[str, Any]]:
+        """Get all mappings (merged default + custom)
+
+        A live view with the custom mappings in front of the defaults rather
+        than a merged copy; dict() it where a real dict is needed.
+        """
+        return ChainMap(self.custom_mappings, DEFAULT_MAPPINGS)
 
     def build_unique_id(self, eep_id: str, address: str, sender: str, shortcut: str) -> str:
         """Build ChristopheHD-compatible unique ID for HA discovery.
@@ -1071,14 +1147,7 @@ class MappingManager:
         Format: enocean_{EEP6}_{ADDR8}_{SHORTCUT}
         With sender: enocean_{EEP6}_{ADDR8}_{SENDER8}_{SHORTCUT}
         """
-        eep = _normalize_eep(eep_id)
-        addr = _normalize_address(address)
-
-        if sender:
-            sndr = _normalize_address(sender)
-            return f"enocean_{eep}_{addr}_{sndr}_{shortcut}"
-        else:
-            return f"enocean_{eep}_{addr}_{shortcut}"
+        return f"{_unique_id_prefix(eep_id, address, sender)}_{shortcut}"
 
     def get_ha_discovery_configs(
         self,
@@ -1095,6 +1164,100 @@ class MappingManager:
     ) -> List[Dict[str, Any]]:
         """Generate Home Assistant MQTT discovery configurations.
 
+        See _build_ha_discovery_configs. The same device is built again and
+        again with the same arguments (every edit rebuilds its siblings on the
+        address, and deleting a channel builds the survivors twice), so the
+        result is kept per argument set. It is the same list every time and
+        must not be modified; nothing does, it is only published.
+
+        The mapping behind the configs can change in two places: this class's
+        custom mappings (_rebuild_effective empties the cache) and the EEP
+        manager's custom profiles and mapping overrides (EEPManager.version
+        moves, checked here).
+        """
+        version = self.eep_manager.version if self.eep_manager else None
+        if version != self._discovery_cache_version or len(self._discovery_cache) >= _DISCOVERY_CACHE_SIZE:
+            # Also emptied when full: renamed and deleted devices leave their
+            # entries behind, and starting over is cheaper than tracking them.
+            self._discovery_cache.clear()
+            self._field_template_cache.clear()
+            self._discovery_cache_version = version
+
+        key = (device_name, eep_id, device_address, device_sender, mqtt_prefix,
+               tuple((k, tuple(v) if isinstance(v, list) else v) for k, v in device_info.items()),
+               actuator_type, invert, channel, entity_name)
+        configs = self._discovery_cache.get(key)
+        if configs is not None:
+            self.discovery_cache_hits += 1
+            return configs
+
+        self.discovery_cache_misses += 1
+        configs = self._build_ha_discovery_configs(
+            device_name, eep_id, device_address, device_sender, mqtt_prefix,
+            device_info, actuator_type, invert, channel, entity_name,
+        )
+        self._discovery_cache[key] = configs
+        return configs
+
+    def _field_templates(self, eep_id: str) -> List[tuple]:
+        """The per-field part of the sensor-mode entity configs for one EEP.
+
+        Name, value template, passed-through mapping keys and the binary sensor
+        payloads depend only on the mapping, yet were worked out again for
+        every device of that EEP. Built once per EEP and mapping revision; one
+        (field_name, component, name, value_template, extra, position_template)
+        tuple per field. extra is shared and only ever copied from.
+        """
+        templates = self._field_template_cache.get(eep_id)
+        if templates is not None:
+            return templates
+
+        templates = []
+        for field_name, field_config in self.get_mapping(eep_id).items():
+            component = field_config.get("component", "sensor")
+            field_template = f"{{{{ value_json.{field_name} }}}}"
+
+            # Pass through all mapping fields to discovery config
+            # Internal keys are handled by the caller or are not HA discovery
+            # fields; the caller sets unique_id, object_id and state_topic first.
+            extra = {
+                key: value for key, value in field_config.items()
+                if key not in _INTERNAL_KEYS
+                and key not in ("unique_id", "object_id", "state_topic")
+            }
+
+            # Binary sensor: HA expects "ON"/"OFF" by default, but EEP values are 0/1
+            if component == "binary_sensor":
+                extra["payload_on"] = "1"
+                extra["payload_off"] = "0"
+
+            templates.append((
+                field_name,
+                component,
+                field_config.get("name", field_name),
+                field_config.get("value_template", field_template),
+                extra,
+                field_template,
+            ))
+
+        self._field_template_cache[eep_id] = templates
+        return templates
+
+    def _build_ha_discovery_configs(
+        self,
+        device_name: str,
+        eep_id: str,
+        device_address: str,
+        device_sender: str,
+        mqtt_prefix: str,
+        device_info: Dict[str, Any],
+        actuator_type: str = "",
+        invert: bool = False,
+        channel: int = 0,
+        entity_name: str = None
+    ) -> List[Dict[str, Any]]:
+        """Generate Home Assistant MQTT discovery configurations.
+
         Returns a list of discovery configs for all entities defined in the mapping.
         Uses ChristopheHD-compatible UID format and per-device availability.
 
@@ -1103,6 +1266,14 @@ class MappingManager:
         """
         configs = []
 
+        # Everything below that depends only on the device is worked out once
+        # here rather than again for every entity: the unique ID prefix (three
+        # normalizations), the topics and the object_id base.
+        uid_prefix = _unique_id_prefix(eep_id, device_address, device_sender)
+        state_topic = f"{mqtt_prefix}/{device_name}/state"
+        command_topic = f"{mqtt_prefix}/{device_name}/set"
+        object_base = _object_id_part(device_name)
+
         avail_config = {
             "topic": f"{mqtt_prefix}/{device_name}/availability",
             "payload_available": "online",
@@ -1114,21 +1285,21 @@ class MappingManager:
             # Two channels of one module share address+sender, so the channel
             # has to be part of the UID or HA would merge them into one entity.
             uid_suffix = f"{actuator_type}_ch{channel}" if channel else actuator_type
-            unique_id = self.build_unique_id(eep_id, device_address, device_sender, uid_suffix)
+            unique_id = f"{uid_prefix}_{uid_suffix}"
 
             if actuator_type == "light":
                 config = {
                     "name": entity_name,  # None = use device name; set when devices share an address (#24)
                     "unique_id": unique_id,
-                    "object_id": f"{device_name}".lower().replace(" ", "_"),
-                    "command_topic": f"{mqtt_prefix}/{device_name}/set",
-                    "state_topic": f"{mqtt_prefix}/{device_name}/state",
+                    "object_id": object_base,
+                    "command_topic": command_topic,
+                    "state_topic": state_topic,
                     "state_value_template": "{{ value_json.state }}",
                     "payload_on": "ON",
                     "payload_off": "OFF",
                     # Brightness support for dimmers (A5-38-08)
-                    "brightness_command_topic": f"{mqtt_prefix}/{device_name}/set",
-                    "brightness_state_topic": f"{mqtt_prefix}/{device_name}/state",
+                    "brightness_command_topic": command_topic,
+                    "brightness_state_topic": state_topic,
                     "brightness_value_template": "{{ value_json.brightness }}",
                     "brightness_scale": 100,
                     "on_command_type": "brightness",
@@ -1141,9 +1312,9 @@ class MappingManager:
                 config = {
                     "name": entity_name,
                     "unique_id": unique_id,
-                    "object_id": f"{device_name}".lower().replace(" ", "_"),
-                    "command_topic": f"{mqtt_prefix}/{device_name}/set",
-                    "state_topic": f"{mqtt_prefix}/{device_name}/state",
+                    "object_id": object_base,
+                    "command_topic": command_topic,
+                    "state_topic": state_topic,
                     "value_template": "{{ value_json.state }}",
                     "payload_on": "ON",
                     "payload_off": "OFF",
@@ -1162,9 +1333,9 @@ class MappingManager:
                 config = {
                     "name": entity_name,
                     "unique_id": unique_id,
-                    "object_id": f"{device_name}".lower().replace(" ", "_"),
-                    "command_topic": f"{mqtt_prefix}/{device_name}/set",
-                    "state_topic": f"{mqtt_prefix}/{device_name}/state",
+                    "object_id": object_base,
+                    "command_topic": command_topic,
+                    "state_topic": state_topic,
                     "value_template": "{{ value_json.state }}",
                     "device_class": "blind",
                     "optimistic": True,
@@ -1182,7 +1353,7 @@ class MappingManager:
                 # command-side inversion in send_d2_05_command.
                 if eep_id.upper().startswith("D2-05"):
                     config["set_position_topic"] = f"{mqtt_prefix}/{device_name}/set/position"
-                    config["position_topic"] = f"{mqtt_prefix}/{device_name}/state"
+                    config["position_topic"] = state_topic
                     pos_expr = "value_json.POS" if invert else "(100 - value_json.POS)"
                     config["position_template"] = (
                         f"{{{{ {pos_expr} if value_json.POS is defined else none }}}}"
@@ -1200,48 +1371,32 @@ class MappingManager:
             # Still add diagnostic entities below
         else:
             # Sensor mode: create entities from EEP mapping
-            mapping = self.get_mapping(eep_id)
-
-            for field_name, field_config in mapping.items():
-                component = field_config.get("component", "sensor")
+            templates = self._field_templates(eep_id.upper())
 
+            for field_name, component, name, value_template, extra, field_template in templates:
                 # Build unique ID (ChristopheHD compatible)
-                unique_id = self.build_unique_id(eep_id, device_address, device_sender, field_name)
+                unique_id = f"{uid_prefix}_{field_name}"
 
                 # Build discovery config
                 config = {
-                    "name": field_config.get("name", field_name),
+                    "name": name,
                     "unique_id": unique_id,
-                    "object_id": f"{device_name}_{field_name}".lower().replace(" ", "_"),
-                    "state_topic": f"{mqtt_prefix}/{device_name}/state",
-                    "value_template": field_config.get(
-                        "value_template",
-                        f"{{{{ value_json.{field_name} }}}}"
-                    )
+                    "object_id": f"{object_base}_{_object_id_part(field_name)}",
+                    "state_topic": state_topic,
+                    "value_template": value_template,
                 }
-
-                # Pass through all mapping fields to discovery config
-                # Internal keys are already handled above or are not HA discovery fields
-                _INTERNAL_KEYS = {"component", "name", "value_template"}
-                for key, value in field_config.items():
-                    if key not in _INTERNAL_KEYS and key not in config:
-                        config[key] = value
-
-                # Binary sensor: HA expects "ON"/"OFF" by default, but EEP values are 0/1
-                if component == "binary_sensor":
-                    config["payload_on"] = "1"
-                    config["payload_off"] = "0"
+                config.update(extra)
 
                 # Add device info
                 config["device"] = device_info
 
                 # Add command topic for controllable entities
-                if component in ["switch", "light", "cover", "climate", "fan"]:
-                    config["command_topic"] = f"{mqtt_prefix}/{device_name}/set"
+                if component in _CONTROLLABLE_COMPONENTS:
+                    config["command_topic"] = command_topic
 
                     if component == "cover":
-                        config["position_topic"] = f"{mqtt_prefix}/{device_name}/state"
-                        config["position_template"] = f"{{{{ value_json.{field_name} }}}}"
+                        config["position_topic"] = state_topic
+                        config["position_template"] = field_template
                         config["set_position_topic"] = f"{mqtt_prefix}/{device_name}/position/set"
 
                 # Per-device availability (not global gateway status)
@@ -1254,17 +1409,15 @@ class MappingManager:
                 })
 
         # Auto-add diagnostic entities for every device: RSSI + Last Seen
-        state_topic = f"{mqtt_prefix}/{device_name}/state"
-
         # RSSI sensor
-        rssi_uid = self.build_unique_id(eep_id, device_address, device_sender, "rssi")
+        rssi_uid = f"{uid_prefix}_rssi"
         configs.append({
             "component": "sensor",
             "unique_id": rssi_uid,
             "config": {
                 "name": "RSSI",
                 "unique_id": rssi_uid,
-                "object_id": f"{device_name}_rssi".lower().replace(" ", "_"),
+                "object_id": f"{object_base}_rssi",
                 "state_topic": state_topic,
                 "value_template": "{{ value_json.rssi }}",
                 "device_class": "signal_strength",
@@ -1277,14 +1430,14 @@ class MappingManager:
         })
 
         # Last Seen sensor
-        last_seen_uid = self.build_unique_id(eep_id, device_address, device_sender, "last_seen")
+        last_seen_uid = f"{uid_prefix}_last_seen"
         configs.append({
             "component": "sensor",
             "unique_id": last_seen_uid,
             "config": {
                 "name": "Last Seen",
                 "unique_id": last_seen_uid,
-                "object_id": f"{device_name}_last_seen".lower().replace(" ", "_"),
+                "object_id": f"{object_base}_last_seen",
                 "state_topic": state_topic,
                 "value_template": "{{ value_json.last_seen }}",
                 "device_class": "timestamp",
@@ -1303,11 +1456,7 @@ class MappingManager:
         # and that is exactly when the LWT matters. Applied here, in one place,
         # rather than at each of the eight config sites, so none can be missed.
         # availability_mode "all" means both have to be up (#37).
-        gateway_avail = {
-            "topic": f"{mqtt_prefix}/__system/status",
-            "payload_available": "online",
-            "payload_not_available": "offline",
-        }
+        gateway_avail = _gateway_availability(mqtt_prefix)
         for item in configs:
             item["config"]["availability"] = [avail_config, gateway_avail]
             item["config"]["availability_mode"] = "all"
@@ -14,20 +14,54 @@ MQTT Topic Structure:
 
 import os
 import json
-import yaml
 import logging
 import asyncio
+import socket
 from datetime import datetime
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Tuple
 import paho.mqtt.client as mqtt
-import aiofiles
+
+from . import file_io, yaml_io
 
 logger = logging.getLogger(__name__)
 
 
+# QoS 1 messages paho may have on the wire without a PUBACK yet
+_MAX_INFLIGHT = 1000
+
+
+# json.dumps builds a new JSONEncoder on every call that passes options;
+# for a state payload of a handful of keys that is a quarter of the time.
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _encode_payload(payload: Dict[str, Any]) -> bytes:
+    """Encode a JSON payload for publishing.
+
+    Compact, and UTF-8 as it is: the smallest payload the C encoder in
+    json produces. See ADR-0012 for why this is not orjson.
+    """
+    return _JSON_ENCODER.encode(payload).encode("utf-8")
+
+
 class MQTTHandler:
     """Handles MQTT communication with Home Assistant"""
 
+    # Attribute reads on the message and publish paths become slot lookups
+    # instead of __dict__ lookups. An attribute not listed here cannot be
+    # set, so add new ones to the list.
+    __slots__ = (
+        "host", "port", "username", "password", "prefix", "discovery_prefix",
+        "device_manager", "client_id", "config_path", "cache_states",
+        "_topic_prefix", "_ha_status_topic", "_gateway_status_topic",
+        "_client", "_connected", "_exact_callbacks", "_wildcard_callbacks",
+        "_loop", "_discovery_payloads", "_handler_tasks",
+        "_on_ha_birth", "_on_device_command",
+        "_last_states", "_states_file", "_legacy_states_file",
+        "_save_dirty", "_save_task", "_save_interval",
+        "_channel_cache", "_multichannel_eeps",
+    )
+
     def __init__(
         self,
         host: str,
@@ -52,10 +86,25 @@ class MQTTHandler:
         self.config_path = config_path
         self.cache_states = cache_states
 
+        # Topics built from the prefixes, which do not change after this;
+        # _dispatch_message compares every received topic against them.
+        self._topic_prefix = f"{self.prefix}/"
+        self._ha_status_topic = f"{self.discovery_prefix}/status"
+        self._gateway_status_topic = f"{self.prefix}/__system/status"
+
         self._client: Optional[mqtt.Client] = None
         self._connected = False
-        self._message_callbacks: Dict[str, Callable] = {}
+        # subscribe() callbacks. Plain topics are looked up directly; only
+        # patterns with + or # are matched level by level, against parts
+        # split once in subscribe() rather than on every message.
+        self._exact_callbacks: Dict[str, Callable] = {}
+        self._wildcard_callbacks: Dict[str, Tuple[Tuple[str, ...], Callable]] = {}
         self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Encoded discovery payloads by topic, with the config they were
+        # encoded from (see publish_discovery_config)
+        self._discovery_payloads: Dict[str, Tuple[Dict[str, Any], bytes]] = {}
+        # Handler tasks started by _dispatch_message, see _spawn
+        self._handler_tasks: set = set()
 
         # Callback for HA birth message / reconnect (re-publish all discoveries)
         self._on_ha_birth: Optional[Callable] = None
@@ -94,7 +143,7 @@ class MQTTHandler:
 
     @property
     def gateway_status_topic(self) -> str:
-        return f"{self.prefix}/__system/status"
+        return self._gateway_status_topic
 
     def set_ha_birth_callback(self, callback: Callable):
         """Set callback for when HA sends birth message or MQTT reconnects.
@@ -110,9 +159,16 @@ class MQTTHandler:
 
     async def connect(self):
         """Connect to MQTT broker with LWT (Last Will and Testament)"""
-        self._loop = asyncio.get_event_loop()
+        # The loop uvicorn runs the app on (uvloop, see main.py). paho's
+        # thread hands received messages to it.
+        self._loop = asyncio.get_running_loop()
 
         self._client = mqtt.Client(client_id=self.client_id)
+        # paho keeps at most 20 QoS 1 messages unacknowledged by default and
+        # holds the rest back until PUBACKs come in, so the discovery and
+        # state republish after a start or an HA restart (hundreds of
+        # retained messages) went out in round trips of 20. Let it pipeline.
+        self._client.max_inflight_messages_set(_MAX_INFLIGHT)
 
         if self.username:
             self._client.username_pw_set(self.username, self.password)
@@ -128,6 +184,7 @@ class MQTTHandler:
         self._client.on_connect = self._on_connect
         self._client.on_disconnect = self._on_disconnect
         self._client.on_message = self._on_message
+        self._client.on_socket_open = self._on_socket_open
 
         try:
             self._client.connect_async(self.host, self.port)
@@ -199,9 +256,8 @@ class MQTTHandler:
             logger.debug(f"Subscribed to {self.prefix}/+/set and {self.prefix}/+/set/+")
 
             # Subscribe to HA birth message for re-publishing discoveries
-            ha_status_topic = f"{self.discovery_prefix}/status"
-            client.subscribe(ha_status_topic, qos=1)
-            logger.info(f"Subscribed to HA birth message: {ha_status_topic}")
+            client.subscribe(self._ha_status_topic, qos=1)
+            logger.info(f"Subscribed to HA birth message: {self._ha_status_topic}")
 
             # On reconnect, re-publish all discoveries
             if self._on_ha_birth and self._loop:
@@ -210,6 +266,24 @@ class MQTTHandler:
         else:
             logger.error(f"MQTT connection failed with code {rc}")
 
+    @staticmethod
+    def _on_socket_open(client, userdata, sock):
+        """Tune the broker socket - called on every (re)connect, before CONNECT
+
+        paho 1.6 leaves Nagle's algorithm on. A PUBLISH is a few hundred
+        bytes, so while one is unacknowledged at TCP level the next waits,
+        and against the receiver's delayed ACK that is up to 40 ms per
+        message. The discovery burst is hundreds of them.
+
+        The send buffer is left to the kernel: setting SO_SNDBUF switches
+        off Linux's buffer autotuning and is capped by wmem_max anyway.
+        """
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except (OSError, AttributeError) as e:
+            # Websocket transport wraps the socket; not our configuration
+            logger.debug(f"Could not set TCP_NODELAY on MQTT socket: {e}")
+
     def _on_disconnect(self, client, userdata, rc):
         """MQTT disconnect callback"""
         self._connected = False
@@ -217,22 +291,38 @@ class MQTTHandler:
             logger.warning(f"MQTT connection lost (rc={rc}), will reconnect")
 
     def _on_message(self, client, userdata, message):
-        """MQTT message callback"""
+        """MQTT message callback (paho's network thread)
+
+        Does nothing but hand the message to _dispatch_message on the event
+        loop: one call_soon_threadsafe per message, where scheduling each
+        handler with run_coroutine_threadsafe cost a cross-thread hop plus a
+        concurrent Future per handler. Decoding, logging and routing all
+        happen on the loop, so paho's thread is straight back to reading the
+        socket.
+        """
+        try:
+            if self._loop:
+                self._loop.call_soon_threadsafe(self._dispatch_message, message.topic, message.payload)
+        except Exception as e:  # an exception here would end paho's thread
+            logger.error(f"Error processing MQTT message: {e}")
+
+    def _dispatch_message(self, topic: str, raw_payload: bytes):
+        """Route a received message to its handlers (event loop)"""
         try:
-            topic = message.topic
-            payload = message.payload.decode('utf-8')
+            payload = raw_payload.decode('utf-8')
 
-            logger.debug(f"MQTT RX [{topic}] = {payload}")
+            # Lazy %-style: this runs for every received message
+            logger.debug("MQTT RX [%s] = %s", topic, payload)
 
             # Handle HA birth message - re-publish all discoveries
-            if topic == f"{self.discovery_prefix}/status" and payload == "online":
+            if topic == self._ha_status_topic and payload == "online":
                 logger.info("HA birth message received - re-publishing all discoveries")
-                if self._on_ha_birth and self._loop:
-                    asyncio.run_coroutine_threadsafe(self._on_ha_birth(), self._loop)
+                if self._on_ha_birth:
+                    self._spawn(self._on_ha_birth())
                 return
 
             # Handle command messages: {prefix}/{device_name}/set[/{entity}]
-            prefix_with_slash = f"{self.prefix}/"
+            prefix_with_slash = self._topic_prefix
             if topic.startswith(prefix_with_slash) and "/set" in topic:
                 remainder = topic[len(prefix_with_slash):]
                 parts = remainder.split("/")
@@ -242,22 +332,35 @@ class MQTTHandler:
                     self._handle_command(device_name, payload, entity)
 
             # Call registered callbacks
-            for pattern, callback in list(self._message_callbacks.items()):
-                if self._topic_matches(pattern, topic):
-                    if self._loop:
-                        asyncio.run_coroutine_threadsafe(
-                            callback(topic, payload),
-                            self._loop
-                        )
+            exact = self._exact_callbacks.get(topic)
+            if exact:
+                self._spawn(exact(topic, payload))
+            if self._wildcard_callbacks:
+                topic_parts = topic.split("/")
+                for pattern_parts, callback in list(self._wildcard_callbacks.values()):
+                    if self._topic_matches(pattern_parts, topic_parts):
+                        self._spawn(callback(topic, payload))
 
         except Exception as e:
             logger.error(f"Error processing MQTT message: {e}")
 
-    def _topic_matches(self, pattern: str, topic: str) -> bool:
-        """Check if topic matches pattern with MQTT wildcards (+ and #)"""
-        pattern_parts = pattern.split("/")
-        topic_parts = topic.split("/")
+    def _spawn(self, coro):
+        """Run a handler as its own task, like run_coroutine_threadsafe did.
+
+        Handlers still run concurrently, so a slow one (a command waiting on
+        the serial port) does not hold up the messages behind it. The task
+        is referenced until done so it cannot be garbage collected midway.
+        """
+        task = asyncio.ensure_future(coro)
+        self._handler_tasks.add(task)
+        task.add_done_callback(self._handler_tasks.discard)
+
+    @staticmethod
+    def _topic_matches(pattern_parts: Tuple[str, ...], topic_parts: list) -> bool:
+        """Check if topic matches pattern with MQTT wildcards (+ and #)
 
+        Both are given split on "/".
+        """
         for i, p in enumerate(pattern_parts):
             if p == "#":
                 return True  # # matches everything from here
@@ -273,17 +376,17 @@ class MQTTHandler:
     def _handle_command(self, device_name: str, payload: str, entity: str = None):
         """Handle command for a device, dispatch to serial handler for actuators"""
         target = f"{device_name}/{entity}" if entity else device_name
-        logger.info(f"Command for {target}: {payload}")
+        logger.info("Command for %s: %s", target, payload)
 
-        if self._on_device_command and self._loop:
-            asyncio.run_coroutine_threadsafe(
-                self._on_device_command(device_name, payload, entity),
-                self._loop
-            )
+        if self._on_device_command:
+            self._spawn(self._on_device_command(device_name, payload, entity))
 
     def subscribe(self, topic_pattern: str, callback: Callable):
         """Subscribe to a topic pattern with callback"""
-        self._message_callbacks[topic_pattern] = callback
+        if "+" in topic_pattern or "#" in topic_pattern:
+            self._wildcard_callbacks[topic_pattern] = (tuple(topic_pattern.split("/")), callback)
+        else:
+            self._exact_callbacks[topic_pattern] = callback
         if self._client and self._connected:
             self._client.subscribe(topic_pattern, qos=1)
 
@@ -293,11 +396,19 @@ class MQTTHandler:
             logger.warning(f"MQTT not connected, message not sent: {topic}")
             return
 
+        self._publish_now(topic, payload, retain, qos)
+
+    def _publish_now(self, topic: str, payload: Any, retain: bool = False, qos: int = 1):
+        """The body of publish(), for loops that checked the connection once.
+
+        paho's publish() only queues the message for its network thread and
+        never blocks, so there is nothing to await here.
+        """
         if isinstance(payload, dict):
-            payload = json.dumps(payload)
+            payload = _encode_payload(payload)
 
         self._client.publish(topic, payload, qos=qos, retain=retain)
-        logger.debug(f"MQTT TX [{topic}] retain={retain} qos={qos}")
+        logger.debug("MQTT TX [%s] retain=%s qos=%s", topic, retain, qos)
 
     async def publish_device_availability(self, device_name: str, available: bool = True):
         """Publish per-device availability"""
@@ -380,8 +491,10 @@ class MQTTHandler:
         """Publish device state and persist for recovery after restart"""
         topic = f"{self.prefix}/{device_name}/state"
 
-        # Add timestamp
-        state["_last_update"] = datetime.now().isoformat()
+        # Add timestamp, on a copy: the caller's dict is left alone, and what
+        # goes into _last_states below is never touched again (replaced on
+        # the next publish, not modified).
+        state = {**state, "_last_update": datetime.now().isoformat()}
 
         # Merge cached other-channel values for multi-channel devices
         state = self._merge_multichannel_state(device_name, state)
@@ -465,14 +578,27 @@ class MQTTHandler:
             raise
 
     async def _save_states(self):
-        """Save last known states to file for recovery after restart"""
+        """Save last known states to file for recovery after restart
+
+        Replaced through file_io.write_atomic (fsync()ed, then renamed), so a
+        stop or power cut in the middle of a write leaves the previous cache
+        rather than a truncated one that fails to load and loses every state.
+        """
         try:
-            os.makedirs(self.config_path, exist_ok=True)
-            async with aiofiles.open(self._states_file, 'w') as f:
-                await f.write(yaml.dump(self._last_states, default_flow_style=False, allow_unicode=True))
+            # Dumped and written in one worker-thread hop. The thread gets
+            # its own copy of the cache, which the loop keeps changing
+            # meanwhile; the state dicts in it are never modified once
+            # stored (see publish_state), so they can be shared.
+            snapshot = dict(self._last_states)
+            await asyncio.to_thread(self._write_states_sync, snapshot)
         except Exception as e:
             logger.error(f"Failed to save states: {e}")
 
+    def _write_states_sync(self, states: Dict[str, Dict[str, Any]]):
+        """Dump states as YAML and replace last_states.yaml with it"""
+        os.makedirs(self.config_path, exist_ok=True)
+        file_io.write_atomic(self._states_file, yaml_io.dump(states))
+
     async def load_persisted_states(self):
         """Load last known states from file into memory.
 
@@ -483,31 +609,40 @@ class MQTTHandler:
         AFTER discovery configs are published to ensure HA evaluates states
         with the correct entity configuration (e.g., payload_on/payload_off).
         """
-        # One-time migration from JSON to YAML
-        if not os.path.exists(self._states_file) and os.path.exists(self._legacy_states_file):
-            try:
-                async with aiofiles.open(self._legacy_states_file, 'r') as f:
-                    self._last_states = json.loads(await f.read())
-                await self._save_states()
-                logger.info("Migrated last_states.json -> last_states.yaml")
-                return
-            except Exception as e:
-                logger.error(f"Failed to migrate last_states.json: {e}")
-
-        if not os.path.exists(self._states_file):
-            logger.info("No persisted states to restore")
+        # Just read it: the file exists on every start but the first, and
+        # asking first costs a second filesystem round trip for that case.
+        try:
+            content = await file_io.read_bytes(self._states_file)
+        except FileNotFoundError:
+            await self._migrate_legacy_states()
+            return
+        except Exception as e:
+            logger.error(f"Failed to load persisted states: {e}")
             return
 
         try:
-            async with aiofiles.open(self._states_file, 'r') as f:
-                content = await f.read()
-                self._last_states = yaml.safe_load(content) or {}
+            self._last_states = yaml_io.safe_load(content) or {}
 
             logger.info(f"Loaded {len(self._last_states)} persisted device states into memory")
 
         except Exception as e:
             logger.error(f"Failed to load persisted states: {e}")
 
+    async def _migrate_legacy_states(self):
+        """One-time migration from JSON to YAML, when there is no YAML yet"""
+        try:
+            self._last_states = json.loads(await file_io.read_bytes(self._legacy_states_file))
+        except FileNotFoundError:
+            logger.info("No persisted states to restore")
+            return
+        except Exception as e:
+            logger.error(f"Failed to migrate last_states.json: {e}")
+            logger.info("No persisted states to restore")
+            return
+
+        await self._save_states()
+        logger.info("Migrated last_states.json -> last_states.yaml")
+
     async def republish_cached_states(self):
         """Publish all cached states to MQTT.
 
@@ -518,11 +653,16 @@ class MQTTHandler:
         if not self._last_states:
             return
 
+        if not self._client or not self._connected:
+            logger.warning("MQTT not connected, cached states not republished")
+            return
+
+        # One plain loop: publishing only hands each message to paho's
+        # queue, so this needs neither an await per device nor tasks.
         for device_name, state in self._last_states.items():
             topic = f"{self.prefix}/{device_name}/state"
-            state["_restored"] = True
-            await self.publish(topic, state, retain=True)
-            logger.debug(f"Restored state for {device_name}")
+            self._publish_now(topic, {**state, "_restored": True}, retain=True)
+            logger.debug("Restored state for %s", device_name)
 
         logger.info(f"Republished {len(self._last_states)} cached device states")
 
@@ -530,14 +670,47 @@ class MQTTHandler:
         """Get last known state for a device"""
         return self._last_states.get(device_name)
 
+    def _discovery_payload(self, discovery_topic: str, config: Dict[str, Any]) -> str:
+        """The encoded discovery config for a topic.
+
+        MappingManager hands out the same config object for as long as
+        nothing about the device or its mapping changed, so the encoded
+        payload is reused while the object is the same one.
+        """
+        cached = self._discovery_payloads.get(discovery_topic)
+        if cached is not None and cached[0] is config:
+            return cached[1]
+        payload = _encode_payload(config)
+        self._discovery_payloads[discovery_topic] = (config, payload)
+        return payload
+
     async def publish_discovery_config(self, component: str, unique_id: str, config: Dict[str, Any]):
         """Publish a single HA MQTT discovery config"""
         discovery_topic = f"{self.discovery_prefix}/{component}/enocean/{unique_id}/config"
-        await self.publish(discovery_topic, config, retain=True)
-        logger.debug(f"Published discovery: {discovery_topic}")
+        await self.publish(discovery_topic, self._discovery_payload(discovery_topic, config), retain=True)
+        logger.debug("Published discovery: %s", discovery_topic)
+
+    def publish_discovery_configs(self, items: List[Dict[str, Any]]) -> int:
+        """Publish a device's discovery configs in one go; returns how many.
+
+        items are MappingManager.build_discovery_for_device() entries. Like
+        republish_cached_states this checks the connection once and hands
+        every message to paho's queue in a plain loop, instead of one await
+        and one connection check per entity; paho's network thread then
+        writes whatever has queued up together.
+        """
+        if not self._client or not self._connected:
+            logger.warning(f"MQTT not connected, {len(items)} discovery configs not sent")
+            return 0
+
+        for item in items:
+            discovery_topic = f"{self.discovery_prefix}/{item['component']}/enocean/{item['unique_id']}/config"
+            self._publish_now(discovery_topic, self._discovery_payload(discovery_topic, item["config"]), retain=True)
+        return len(items)
 
     async def remove_discovery_config(self, component: str, unique_id: str):
         """Remove HA discovery config by publishing empty payload"""
         discovery_topic = f"{self.discovery_prefix}/{component}/enocean/{unique_id}/config"
+        self._discovery_payloads.pop(discovery_topic, None)
         await self.publish(discovery_topic, "", retain=True)
-        logger.info(f"Removed discovery: {discovery_topic}")
+        logger.info("Removed discovery: %s", discovery_topic)
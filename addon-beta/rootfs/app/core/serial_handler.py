@@ -6,12 +6,15 @@ Uses a dedicated thread for serial I/O to avoid blocking the asyncio event loop.
 """
 
 import os
+import re
 import logging
 import asyncio
 import serial
 import socket
+import struct
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Callable, List, Dict, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +28,30 @@ PACKET_TYPE_COMMON_COMMAND = 0x05
 # Common commands
 CO_RD_IDBASE = 0x08
 
+# F6 rocker simulation for Eltako-style actuators: the rocker byte of the
+# press telegram per command (BI = 0x50 on/up, B0 = 0x70 off/down). STOP is
+# a release without a press, hence None. Built once, looked up per command.
+F6_ROCKER_PRESS = {
+    "ON": bytes([0x50]),
+    "OPEN": bytes([0x50]),
+    "OFF": bytes([0x70]),
+    "CLOSE": bytes([0x70]),
+    "STOP": None,
+}
+F6_ROCKER_RELEASE = bytes([0x00])
+
+# 32-bit EnOcean IDs (sender, destination) as they sit in a telegram. Read
+# and written in place, without slicing out or building 4-byte pieces.
+_ID = struct.Struct(">I")
+# The tail of a radio telegram: sender ID and status
+_SENDER_STATUS = struct.Struct(">IB")
+# Radio TX optional data: SubTelNum, DestinationID, dBm, SecurityLevel
+_TX_OPTIONAL = struct.Struct(">BIBB")
+
+# _read_packet result when bytes arrived but no valid packet came of them
+# (line noise, a truncated packet, a CRC error)
+_DISCARDED = object()
+
 
 class TransceiverError(Exception):
     """Base class for EnOcean transceiver command failures."""
@@ -63,6 +90,103 @@ CRC8_TABLE = [
 ]
 
 
+def esp3_packet(packet_type: int, data: bytes, optional: bytes = b"") -> bytes:
+    """Frame data as an ESP3 packet: sync byte, header, header CRC, data,
+    optional data, data CRC.
+
+    Filled into one buffer of the final size rather than concatenated
+    piece by piece, which copied the whole packet again at every step.
+    """
+    data_len = len(data)
+    optional_len = len(optional)
+    end = 6 + data_len + optional_len
+
+    packet = bytearray(end + 1)
+    packet[0] = SYNC_BYTE
+    packet[1] = (data_len >> 8) & 0xFF
+    packet[2] = data_len & 0xFF
+    packet[3] = optional_len
+    packet[4] = packet_type
+    packet[5] = _crc8_header(packet[1], packet[2], packet[3], packet[4])
+    packet[6:6 + data_len] = data
+    packet[6 + data_len:end] = optional
+    packet[end] = crc8(packet[6:end])
+    return bytes(packet)
+
+
+# Field kinds in a decode plan (see _compile_fields)
+_FIELD_ENUM = 0
+_FIELD_SCALED = 1
+_FIELD_RAW = 2
+
+
+def _compile_fields(fields: List[Dict[str, Any]]) -> tuple:
+    """Turn an EEP profile's field list into a decode plan.
+
+    One (shortcut, end_bit, mask, kind, extra) tuple per field, with
+    everything that does not depend on the telegram worked out here
+    instead of on every decode: the field's end bit (offset + size; the
+    shift still depends on the telegram length), its mask, and per kind
+    - _FIELD_ENUM: {raw value: description}. A value matched when its str()
+      equalled str(raw), so only values that print as a plain decimal int
+      can match, and the first one listed wins.
+    - _FIELD_SCALED: (scale_min, range_min, scale span, range span), used
+      in the same order of operations as before so results are unchanged.
+    - _FIELD_RAW: None (also a value field with an empty range).
+    """
+    plan = []
+    for fdef in fields:
+        shortcut = fdef.get("shortcut", "")
+        offset = fdef.get("offset", 0)
+        size = fdef.get("size", 8)
+        field_type = fdef.get("type", "value")
+        end_bit = offset + size
+        mask = (1 << size) - 1
+
+        if field_type == "enum":
+            descriptions = {}
+            for v in fdef.get("values", []):
+                text = str(v.get("value"))
+                try:
+                    number = int(text)
+                except ValueError:
+                    continue
+                if str(number) == text:
+                    descriptions.setdefault(number, v.get("description", ""))
+            plan.append((shortcut, end_bit, mask, _FIELD_ENUM, descriptions))
+
+        elif field_type == "value":
+            scale_min = fdef.get("scale_min", 0)
+            scale_max = fdef.get("scale_max", 255)
+            range_min = fdef.get("min", 0)
+            range_max = fdef.get("max", 255)
+            if range_max != range_min:
+                scaling = (scale_min, range_min, scale_max - scale_min, range_max - range_min)
+                plan.append((shortcut, end_bit, mask, _FIELD_SCALED, scaling))
+            else:
+                plan.append((shortcut, end_bit, mask, _FIELD_RAW, None))
+
+        else:
+            plan.append((shortcut, end_bit, mask, _FIELD_RAW, None))
+
+    return tuple(plan)
+
+
+_ENOCEAN_ID_RE = re.compile(r"(?:0[xX])?[0-9A-Fa-f]{1,8}")
+
+
+def parse_enocean_id(value: str) -> int:
+    """Parse a 32-bit EnOcean ID such as '0x05834FA4' or 'FFB1C680'.
+
+    Raises ValueError for anything else. That includes IDs wider than 32
+    bits, which int(x, 16) accepts and send_telegram could not encode.
+    """
+    value = value.strip()
+    if not _ENOCEAN_ID_RE.fullmatch(value):
+        raise ValueError(f"not a 32-bit hex ID: {value!r}")
+    return int(value, 16)
+
+
 def crc8(data: bytes) -> int:
     """Calculate CRC8 checksum"""
     crc = 0
@@ -71,30 +195,50 @@ def crc8(data: bytes) -> int:
     return crc
 
 
-@dataclass
+# The CRC is linear, so over a fixed length it splits into one lookup per
+# byte: a byte n places from the end goes through the table n times. The
+# ESP3 header is always 4 bytes, checked for every sync byte found,
+# including the false ones in line noise.
+_CRC8_TABLE_X2 = [CRC8_TABLE[v] for v in CRC8_TABLE]
+_CRC8_TABLE_X3 = [CRC8_TABLE[v] for v in _CRC8_TABLE_X2]
+_CRC8_TABLE_X4 = [CRC8_TABLE[v] for v in _CRC8_TABLE_X3]
+
+
+def _crc8_header(b1: int, b2: int, b3: int, b4: int) -> int:
+    """CRC8 of the four ESP3 header bytes, same result as crc8()"""
+    return _CRC8_TABLE_X4[b1] ^ _CRC8_TABLE_X3[b2] ^ _CRC8_TABLE_X2[b3] ^ CRC8_TABLE[b4]
+
+
+@dataclass(frozen=True, slots=True)
 class RadioTelegram:
-    """Represents an EnOcean radio telegram"""
+    """Represents an EnOcean radio telegram
+
+    The hex forms are built once here: every received telegram is logged,
+    buffered and matched by them, each of which used to format them again.
+    Frozen so they cannot go stale.
+    """
     rorg: int
     data: bytes
     sender_id: int
     status: int
     dbm: int = 0
-
-    @property
-    def sender_hex(self) -> str:
-        """Returns sender ID as hex string"""
-        return f"0x{self.sender_id:08X}"
-
-    @property
-    def rorg_hex(self) -> str:
-        """Returns RORG as hex string"""
-        return f"{self.rorg:02X}"
+    # Sender ID as hex string, e.g. "0x05834FA4"
+    sender_hex: str = field(init=False, repr=False, compare=False)
+    # RORG as hex string, e.g. "A5"
+    rorg_hex: str = field(init=False, repr=False, compare=False)
+    # Payload as upper-case hex string
+    data_hex: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "sender_hex", f"0x{self.sender_id:08X}")
+        object.__setattr__(self, "rorg_hex", f"{self.rorg:02X}")
+        object.__setattr__(self, "data_hex", self.data.hex().upper())
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
         return {
             "rorg": self.rorg_hex,
-            "data": self.data.hex().upper(),
+            "data": self.data_hex,
             "sender_id": self.sender_hex,
             "status": self.status,
             "dbm": self.dbm
@@ -127,6 +271,16 @@ class SerialHandler:
         self._connected = False
         self._running = False
         self._read_task: Optional[asyncio.Task] = None
+        # The reader's own thread: a blocking read waits up to a second, and
+        # in the shared default pool it would hold a worker that asyncio's
+        # to_thread file I/O needs.
+        self._reader_executor: Optional[ThreadPoolExecutor] = None
+        # Received bytes not yet parsed into a packet, and bytes discarded
+        # while hunting for a sync byte. Only touched from the reader thread
+        # (and by _close_transport, when no read is running).
+        self._rx_buf = bytearray()
+        self._skipped_bytes = 0
+        self._skipped_sample = b""
         self._telegram_callbacks: List[Callable] = []
         self._teach_in_callback: Optional[Callable] = None
         # UTE (RORG D4) auto-response sender offset. NodOn D2-05-00 covers in
@@ -140,6 +294,13 @@ class SerialHandler:
         # Serializes _send_command() so concurrent callers don't clobber
         # each other's _response_future slot.
         self._cmd_lock = asyncio.Lock()
+        # Decode plans by id(profile): (profile, its fields list, plan). The
+        # profile is held so its id cannot be reused by another one, and the
+        # plan is rebuilt if the profile gets a new field list. Emptied
+        # whenever EEPManager.version moves, like the API's profile caches,
+        # so a reload does not keep the replaced profiles alive here.
+        self._decode_plans: Dict[int, tuple] = {}
+        self._decode_plans_version = -1
 
     @property
     def is_connected(self) -> bool:
@@ -162,7 +323,7 @@ class SerialHandler:
             self._connected = True
             self._running = True
 
-            # Start async read loop (uses run_in_executor for blocking serial reads)
+            # Start async read loop (blocking reads run in its reader thread)
             self._read_task = asyncio.create_task(self._read_loop())
 
             logger.info(f"Connected to EnOcean transceiver at {self.port}")
@@ -237,11 +398,17 @@ class SerialHandler:
 
         await self._close_transport()
 
+        if self._reader_executor:
+            # Not waited for: a read still blocked in it ends with the
+            # transport closed above.
+            self._reader_executor.shutdown(wait=False)
+            self._reader_executor = None
+
         self._connected = False
         logger.info("Disconnected from EnOcean transceiver")
 
     async def _read_loop(self):
-        """Main read loop using run_in_executor for blocking serial reads.
+        """Main read loop; the blocking packet reads run in a reader thread.
 
         Recovers from connection loss by closing the dead transport and
         retrying the connect with exponential backoff. Previously any
@@ -250,20 +417,21 @@ class SerialHandler:
         flowed and nothing in the log said why.
         """
         loop = asyncio.get_event_loop()
+        if self._reader_executor is None:
+            self._reader_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="enocean-rx")
         timeout_count = 0
         packet_count = 0
         backoff = 1.0
-        skipped_bytes = 0
-        skipped_sample = b""
 
         logger.info("Listening for EnOcean telegrams...")
 
         while self._running:
             try:
-                # Wait for sync byte (0x55) using run_in_executor
-                byte = await loop.run_in_executor(None, self._serial_read, 1)
+                # One hop to the reader thread per packet: sync byte, header,
+                # header CRC and data block used to be four separate ones.
+                packet = await loop.run_in_executor(self._reader_executor, self._read_packet)
 
-                if not byte:
+                if packet is None:
                     timeout_count += 1
                     if timeout_count % 30 == 0:
                         logger.info(f"Serial reader: still waiting for data ({timeout_count}s elapsed, {packet_count} packets so far)")
@@ -272,74 +440,21 @@ class SerialHandler:
                 timeout_count = 0
                 backoff = 1.0  # reset backoff on any successful read
 
-                if byte[0] != SYNC_BYTE:
-                    # One line per discarded byte floods the log at debug level
-                    # exactly when debug is needed: a gateway that emits a few
-                    # stray bytes per packet produces a steady stream of these
-                    # and pushes the actual telegrams out of the add-on's log
-                    # buffer. Count them and report on resync instead, which
-                    # keeps the diagnostic (how much noise, and what it was)
-                    # without burying everything else.
-                    skipped_bytes += 1
-                    if len(skipped_sample) < 24:
-                        skipped_sample += byte
-                    if skipped_bytes % 1000 == 0:
-                        logger.debug(f"Still hunting for sync: {skipped_bytes} bytes discarded, starts {skipped_sample.hex().upper()}")
-                    continue
-
-                if skipped_bytes:
-                    logger.debug(f"Found sync byte 0x55 after discarding {skipped_bytes} byte(s), starts {skipped_sample.hex().upper()}")
-                    skipped_bytes = 0
-                    skipped_sample = b""
-                else:
-                    logger.debug("Found sync byte 0x55")
-
-                # Read header (4 bytes: data_len_hi, data_len_lo, optional_len, packet_type)
-                header = await loop.run_in_executor(None, self._serial_read, 4)
-                if len(header) != 4:
-                    logger.warning("Incomplete header received")
-                    continue
-
-                data_len = (header[0] << 8) | header[1]
-                optional_len = header[2]
-                packet_type = header[3]
-
-                # Read header CRC
-                header_crc_byte = await loop.run_in_executor(None, self._serial_read, 1)
-                if len(header_crc_byte) != 1:
-                    logger.warning("Incomplete header CRC")
-                    continue
-
-                # Verify header CRC
-                if crc8(header) != header_crc_byte[0]:
-                    logger.debug("Invalid header CRC")
-                    continue
-
-                # Read data + optional data + data CRC
-                total_data_len = data_len + optional_len + 1
-                data_block = await loop.run_in_executor(None, self._serial_read, total_data_len)
-                if len(data_block) != total_data_len:
-                    logger.warning(f"Incomplete data block: {len(data_block)}/{total_data_len}")
+                if packet is _DISCARDED:
                     continue
 
-                # Split into parts
-                packet_data = data_block[:data_len]
-                optional_data = data_block[data_len:data_len + optional_len]
-                data_crc = data_block[-1]
-
-                # Verify data CRC
-                if crc8(packet_data + optional_data) != data_crc:
-                    logger.debug("Invalid data CRC")
-                    continue
+                packet_type, packet_data, optional_data = packet
+                data_len = len(packet_data)
+                optional_len = len(optional_data)
 
                 packet_count += 1
-                logger.debug(f"ESP3 packet #{packet_count}: type={packet_type:#04x} data_len={data_len} opt_len={optional_len}")
+                logger.debug("ESP3 packet #%d: type=%#04x data_len=%d opt_len=%d", packet_count, packet_type, data_len, optional_len)
 
                 # Process by packet type
                 if packet_type == PACKET_TYPE_RADIO:
                     await self._process_radio_telegram(packet_data, optional_data)
                 elif packet_type == PACKET_TYPE_RESPONSE:
-                    logger.debug(f"Response packet: {packet_data.hex()}")
+                    logger.debug("Response packet: %s", packet_data.hex())
                     if self._response_future and not self._response_future.done():
                         self._response_future.set_result(packet_data)
                 elif packet_type == PACKET_TYPE_EVENT:
@@ -368,6 +483,8 @@ class SerialHandler:
 
     async def _close_transport(self):
         """Close the current serial/socket transport without touching task state."""
+        # Whatever is left belongs to the old connection
+        self._rx_buf.clear()
         if self._serial:
             try:
                 self._serial.close()
@@ -431,8 +548,113 @@ class SerialHandler:
         except Exception as e:
             logger.debug(f"Base ID re-read after reconnect failed: {e}")
 
+    def _read_packet(self):
+        """Read one ESP3 packet - blocking, runs in the reader thread.
+
+        Returns (packet_type, data, optional_data) for a valid packet, None
+        when nothing arrived within the read timeout, and _DISCARDED when
+        bytes arrived that did not make a valid packet. Transport errors
+        propagate to _read_loop, which reconnects.
+
+        Reads go into _rx_buf, as much as the transport has waiting, and the
+        packet is cut from there. Line noise is skipped with one find() over
+        the buffer instead of a read per byte.
+        """
+        buf = self._rx_buf
+        skipped_before = self._skipped_bytes
+
+        # Wait for sync byte (0x55)
+        while True:
+            idx = buf.find(SYNC_BYTE)
+            if idx >= 0:
+                break
+            if buf:
+                self._skip_noise(len(buf))
+            if not self._running:
+                return _DISCARDED
+            if not self._fill_rx_buf(1):
+                # Idle unless this call dropped noise: _skipped_bytes stays
+                # up until a sync byte turns up, and a line that went quiet
+                # after a burst must still count as waiting for data.
+                return _DISCARDED if self._skipped_bytes != skipped_before else None
+        if idx:
+            self._skip_noise(idx)
+
+        if self._skipped_bytes:
+            # Guarded rather than just %-style: the sample's hex is an
+            # argument, and would be built for nothing with debug off.
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Found sync byte 0x55 after discarding %d byte(s), starts %s",
+                             self._skipped_bytes, self._skipped_sample.hex().upper())
+            self._skipped_bytes = 0
+            self._skipped_sample = b""
+        else:
+            logger.debug("Found sync byte 0x55")
+
+        # Header (4 bytes: data_len_hi, data_len_lo, optional_len, packet_type)
+        # and the header CRC after it, behind the sync byte
+        if not self._fill_rx_buf(6):
+            logger.warning("Incomplete header CRC" if len(buf) == 5 else "Incomplete header received")
+            buf.clear()
+            return _DISCARDED
+
+        # Verify header CRC. On a mismatch this 0x55 was not a packet start;
+        # the real one may be inside what was taken for the header, so the
+        # hunt resumes right behind it.
+        if _crc8_header(buf[1], buf[2], buf[3], buf[4]) != buf[5]:
+            logger.debug("Invalid header CRC")
+            del buf[:1]
+            return _DISCARDED
+
+        data_len = (buf[1] << 8) | buf[2]
+        optional_len = buf[3]
+        packet_type = buf[4]
+
+        # Data + optional data + data CRC
+        end = 6 + data_len + optional_len
+        if not self._fill_rx_buf(end + 1):
+            logger.warning(f"Incomplete data block: {len(buf) - 6}/{end - 5}")
+            buf.clear()
+            return _DISCARDED
+
+        # Verify data CRC
+        if crc8(buf[6:end]) != buf[end]:
+            logger.debug("Invalid data CRC")
+            del buf[:1]
+            return _DISCARDED
+
+        packet_data = bytes(buf[6:6 + data_len])
+        optional_data = bytes(buf[6 + data_len:end])
+        del buf[:end + 1]
+        return packet_type, packet_data, optional_data
+
+    def _skip_noise(self, count: int):
+        """Drop count bytes of noise from _rx_buf; counted and logged on resync."""
+        if len(self._skipped_sample) < 24:
+            self._skipped_sample += bytes(self._rx_buf[:min(count, 24 - len(self._skipped_sample))])
+        before = self._skipped_bytes
+        self._skipped_bytes += count
+        if self._skipped_bytes // 1000 != before // 1000 and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Still hunting for sync: %d bytes discarded, starts %s",
+                         self._skipped_bytes, self._skipped_sample.hex().upper())
+        del self._rx_buf[:count]
+
+    def _fill_rx_buf(self, size: int) -> bool:
+        """Read until _rx_buf holds at least size bytes. False on read timeout."""
+        buf = self._rx_buf
+        while len(buf) < size:
+            chunk = self._serial_read(size - len(buf))
+            if not chunk:
+                return False
+            buf += chunk
+        return True
+
     def _serial_read(self, size: int) -> bytes:
-        """Blocking serial/TCP read - called via run_in_executor.
+        """Blocking serial/TCP read - called from _read_packet in the reader thread.
+
+        Waits for at least size bytes (serial) or any data (TCP), but takes
+        whatever more the transport already has, so a burst of packets costs
+        one read rather than several per packet.
 
         Returns b"" on timeout (normal, the read loop treats this as idle).
         Raises ConnectionError / serial.SerialException on real failure so the
@@ -444,18 +666,15 @@ class SerialHandler:
             if not self._socket:
                 raise ConnectionError("TCP socket not open")
             try:
-                data = b""
-                while len(data) < size:
-                    chunk = self._socket.recv(size - len(data))
-                    if not chunk:
-                        raise ConnectionResetError("TCP peer closed connection (FIN received)")
-                    data += chunk
-                return data
+                data = self._socket.recv(max(size, 4096))
             except socket.timeout:
                 return b""
+            if not data:
+                raise ConnectionResetError("TCP peer closed connection (FIN received)")
+            return data
 
         if self._serial and self._serial.is_open:
-            return self._serial.read(size)
+            return self._serial.read(max(size, self._serial.in_waiting))
 
         raise ConnectionError("No transport available")
 
@@ -466,9 +685,8 @@ class SerialHandler:
 
         rorg = data[0]
 
-        # Extract sender ID (last 4 bytes before status)
-        sender_id = int.from_bytes(data[-5:-1], 'big')
-        status = data[-1]
+        # Extract sender ID (last 4 bytes before status) and status
+        sender_id, status = _SENDER_STATUS.unpack_from(data, len(data) - 5)
 
         # Extract actual data (between RORG and sender ID)
         payload = data[1:-5]
@@ -491,7 +709,8 @@ class SerialHandler:
             dbm=dbm
         )
 
-        logger.debug(f"RX [{telegram.sender_hex}] RORG={telegram.rorg_hex} Data={telegram.data.hex().upper()} dBm={telegram.dbm}")
+        # Lazy %-style: this runs for every telegram
+        logger.debug("RX [%s] RORG=%s Data=%s dBm=%s", telegram.sender_hex, telegram.rorg_hex, telegram.data_hex, telegram.dbm)
 
         # Check if this is a teach-in telegram.
         # Only treat as teach-in if the sender is NOT already configured:
@@ -500,7 +719,7 @@ class SerialHandler:
         # otherwise mis-flag as a teach-in on every single telegram.
         already_configured = (
             self.device_manager is not None
-            and self.device_manager.get_device_by_address(telegram.sender_hex) is not None
+            and self.device_manager.get_device_by_id(telegram.sender_id) is not None
         )
         if telegram.rorg == 0xD4:
             # UTE (RORG 0xD4) teach-in queries, e.g. NodOn D2-05-00 in
@@ -525,7 +744,7 @@ class SerialHandler:
             self.telegram_buffer.add(
                 sender_id=telegram.sender_hex,
                 rorg=telegram.rorg_hex,
-                data=telegram.data.hex().upper(),
+                data=telegram.data_hex,
                 status=telegram.status,
                 dbm=telegram.dbm,
                 device_name=device_name,
@@ -687,9 +906,9 @@ class SerialHandler:
             return None, None, None
 
         # Find device by address
-        device = self.device_manager.get_device_by_address(telegram.sender_hex)
+        device = self.device_manager.get_device_by_id(telegram.sender_id)
         if not device:
-            logger.info(f"RX [{telegram.sender_hex}] Unknown device (not configured)")
+            logger.info("RX [%s] Unknown device (not configured)", telegram.sender_hex)
             return None, None, None
 
         # Get EEP profile
@@ -706,7 +925,8 @@ class SerialHandler:
         try:
             expected_rorg = int(profile.rorg, 16)
             if telegram.rorg != expected_rorg:
-                logger.debug(f"RX [{telegram.sender_hex}] RORG mismatch: got 0x{telegram.rorg:02X}, expected 0x{expected_rorg:02X} for {device.eep_id}, skipping decode")
+                logger.debug("RX [%s] RORG mismatch: got 0x%02X, expected 0x%02X for %s, skipping decode",
+                             telegram.sender_hex, telegram.rorg, expected_rorg, device.eep_id)
                 return device.name, device.eep_id, None
         except (ValueError, AttributeError):
             pass  # If RORG can't be parsed, proceed with decode anyway
@@ -727,7 +947,7 @@ class SerialHandler:
             # EDIMR flag (Eltako quirk: sends EDIMR=0 but uses 0-100 range).
             # Treat EDIM as 0-100 directly (matches brightness_scale: 100).
             decoded["brightness"] = round(min(float(edim), 100)) if edim else 0
-            logger.debug(f"Light state: SW={sw}, EDIM={edim}, brightness={decoded['brightness']}%")
+            logger.debug("Light state: SW=%s, EDIM=%s, brightness=%s%%", sw, edim, decoded["brightness"])
 
         # F6-driven switch actuators (e.g. Eltako FSR61 with status reporting
         # enabled) confirm their state with plain rocker telegrams. Derive the
@@ -748,16 +968,16 @@ class SerialHandler:
                 if getattr(device, "invert", False):
                     on = not on
                 decoded["state"] = "ON" if on else "OFF"
-                logger.debug(f"Switch state report: R1={r1} -> {decoded['state']}")
+                logger.debug("Switch state report: R1=%s -> %s", r1, decoded["state"])
 
-        logger.debug(f"RX [{telegram.sender_hex}] Device={device.name} EEP={device.eep_id} Decoded={decoded}")
+        logger.debug("RX [%s] Device=%s EEP=%s Decoded=%s", telegram.sender_hex, device.name, device.eep_id, decoded)
 
         # Publish to MQTT, to EVERY device on this address. A 2-channel module
         # is configured once per output, all sharing the module address, so
         # publishing only to the first one left the second channel without any
         # state (#24).
         if self.mqtt_handler:
-            targets = self.device_manager.get_devices_by_address(telegram.sender_hex) or [device]
+            targets = self.device_manager.get_devices_by_id(telegram.sender_id) or [device]
 
             # A D2-01 module reports its output in an addressed status
             # telegram: IO carries the channel, OV the output value (0 = off,
@@ -781,14 +1001,14 @@ class SerialHandler:
                             payload["state"] = "ON" if ov else "OFF"
                             if target.actuator_type == "light":
                                 payload["brightness"] = min(ov, 100)
-                            logger.debug(f"D2-01 status: IO={io} OV={ov} -> {target.name} {payload['state']}")
+                            logger.debug("D2-01 status: IO=%s OV=%s -> %s %s", io, ov, target.name, payload["state"])
                     else:
                         # Another channel's value. Leave this entity's state
                         # alone instead of overwriting it with a foreign one.
                         payload.pop("state", None)
                         payload.pop("brightness", None)
                 await self.mqtt_handler.publish_state(target.name, payload)
-                logger.debug(f"TX MQTT [{target.name}] Published state to {self.mqtt_handler.prefix}/{target.name}/state")
+                logger.debug("TX MQTT [%s] Published state to %s/%s/state", target.name, self.mqtt_handler.prefix, target.name)
 
         return device.name, device.eep_id, decoded
 
@@ -804,48 +1024,38 @@ class SerialHandler:
 
         if not profile.fields:
             # No field definitions - return raw data
-            decoded["raw"] = telegram.data.hex().upper()
+            decoded["raw"] = telegram.data_hex
             return decoded
 
+        if self.eep_manager.version != self._decode_plans_version:
+            self._decode_plans.clear()
+            self._decode_plans_version = self.eep_manager.version
+
+        entry = self._decode_plans.get(id(profile))
+        if entry is None or entry[0] is not profile or entry[1] is not profile.fields:
+            entry = (profile, profile.fields, _compile_fields(profile.fields))
+            self._decode_plans[id(profile)] = entry
+
         # Decode each field
         data_int = int.from_bytes(telegram.data, 'big')
         data_bits = len(telegram.data) * 8
 
-        for field in profile.fields:
-            shortcut = field.get("shortcut", "")
-            offset = field.get("offset", 0)
-            size = field.get("size", 8)
-            field_type = field.get("type", "value")
-
+        for shortcut, end_bit, mask, kind, extra in entry[2]:
             # Extract bits
-            shift = data_bits - offset - size
+            shift = data_bits - end_bit
             if shift < 0:
                 continue
-            mask = (1 << size) - 1
             raw_value = (data_int >> shift) & mask
 
             # Decode based on type
-            if field_type == "enum":
-                # Find matching enum value
-                values = field.get("values", [])
+            if kind == _FIELD_ENUM:
                 decoded[shortcut] = raw_value
-                for v in values:
-                    if str(v.get("value")) == str(raw_value):
-                        decoded[f"{shortcut}_text"] = v.get("description", "")
-                        break
-
-            elif field_type == "value":
-                # Scale value
-                scale_min = field.get("scale_min", 0)
-                scale_max = field.get("scale_max", 255)
-                range_min = field.get("min", 0)
-                range_max = field.get("max", 255)
-
-                if range_max != range_min:
-                    scaled = scale_min + (raw_value - range_min) * (scale_max - scale_min) / (range_max - range_min)
-                    decoded[shortcut] = round(scaled, 2)
-                else:
-                    decoded[shortcut] = raw_value
+                if raw_value in extra:
+                    decoded[f"{shortcut}_text"] = extra[raw_value]
+
+            elif kind == _FIELD_SCALED:
+                scale_min, range_min, scale_span, range_span = extra
+                decoded[shortcut] = round(scale_min + (raw_value - range_min) * scale_span / range_span, 2)
 
             else:
                 decoded[shortcut] = raw_value
@@ -893,11 +1103,7 @@ class SerialHandler:
         if not self._connected:
             raise NotConnectedError(f"Cannot send 0x{command_code:02X}: transceiver not connected")
 
-        packet_data = bytes([command_code])
-        header = bytes([0x00, len(packet_data), 0x00, PACKET_TYPE_COMMON_COMMAND])
-        header_crc = crc8(header)
-        data_crc = crc8(packet_data)
-        packet = bytes([SYNC_BYTE]) + header + bytes([header_crc]) + packet_data + bytes([data_crc])
+        packet = esp3_packet(PACKET_TYPE_COMMON_COMMAND, bytes([command_code]))
 
         async with self._cmd_lock:
             loop = asyncio.get_event_loop()
@@ -1066,6 +1272,29 @@ class SerialHandler:
         logger.info("=== DIMMER TEACH-IN COMPLETE === (3 steps, 4 telegrams)")
         return True
 
+    async def send_f6_rocker(self, sender_id: int, command: str) -> bool:
+        """Simulate a rocker press + release (or a bare release for STOP).
+
+        Sent as broadcast like a real pushbutton; Eltako actuators match on
+        the sender ID, not on the destination. Press is status 0x30 (T21+NU),
+        release 0x20 (T21). Returns False for a command with no rocker action.
+        """
+        if command not in F6_ROCKER_PRESS:
+            return False
+        press = F6_ROCKER_PRESS[command]
+        broadcast = 0xFFFFFFFF
+        if press is not None:
+            await self.send_telegram(
+                sender_id=sender_id, rorg=0xF6,
+                data=press, destination=broadcast, status=0x30
+            )
+            await asyncio.sleep(0.1)
+        await self.send_telegram(
+            sender_id=sender_id, rorg=0xF6,
+            data=F6_ROCKER_RELEASE, destination=broadcast, status=0x20
+        )
+        return True
+
     async def send_a5_dimmer_command(self, sender_id: int, command: str,
                                      dim_value: int = 255, ramp_time: int = 1) -> bool:
         """Send A5-38-08 Central Command Dimming telegram.
@@ -1249,36 +1478,25 @@ class SerialHandler:
 
         # Build radio telegram
         # RORG + data + sender_id (4 bytes) + status (1 byte)
-        sender_bytes = sender_id.to_bytes(4, 'big')
         if status is None:
             # F6 (RPS) needs T21 flag (0x30 for pressed, 0x20 for released)
             status = 0x30 if (rorg == 0xF6 and data and data[0] != 0x00) else 0x00
 
-        packet_data = bytes([rorg]) + data + sender_bytes + bytes([status])
+        packet_data = bytearray(len(data) + 6)
+        packet_data[0] = rorg
+        packet_data[1:-5] = data
+        _ID.pack_into(packet_data, len(packet_data) - 5, sender_id)
+        packet_data[-1] = status
 
         # Optional data: SubTelNum, DestinationID, dBm, SecurityLevel
-        dest_bytes = destination.to_bytes(4, 'big')
-        optional = bytes([0x03]) + dest_bytes + bytes([0xFF, 0x00])
-
-        # Build ESP3 packet
-        data_len = len(packet_data)
-        optional_len = len(optional)
-
-        header = bytes([
-            (data_len >> 8) & 0xFF,
-            data_len & 0xFF,
-            optional_len,
-            PACKET_TYPE_RADIO
-        ])
-
-        header_crc = crc8(header)
-        data_crc = crc8(packet_data + optional)
+        optional = _TX_OPTIONAL.pack(0x03, destination, 0xFF, 0x00)
 
-        packet = bytes([SYNC_BYTE]) + header + bytes([header_crc]) + packet_data + optional + bytes([data_crc])
+        packet = esp3_packet(PACKET_TYPE_RADIO, packet_data, optional)
 
         try:
             await self._write_packet(packet)
-            logger.debug(f"TX EnOcean: RORG={rorg:02X}, Data={data.hex()}, Dest={destination:08X}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("TX EnOcean: RORG=%02X, Data=%s, Dest=%08X", rorg, data.hex(), destination)
             return True
         except (ConnectionError, serial.SerialException, OSError) as e:
             logger.error(f"Transport error sending telegram: {e}")
@@ -2,19 +2,26 @@
 Telegram Buffer - Stores recent EnOcean telegrams for debugging
 """
 
+import time
 import logging
 from typing import List, Dict, Any, Optional
 from collections import deque
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
 
 @dataclass
 class TelegramEntry:
-    """A stored telegram entry"""
-    timestamp: str
+    """A stored telegram entry
+
+    timestamp is the receive time as time.time(). It is turned into the ISO
+    string the API returns only in to_dict: most entries are pushed out of
+    the ring unread, and formatting a datetime costs more than the rest of
+    add() together.
+    """
+    timestamp: float
     sender_id: str
     rorg: str
     data: str
@@ -26,7 +33,22 @@ class TelegramEntry:
     is_teach_in: bool = False
 
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        # Spelled out rather than asdict(), which deep-copies decoded for
+        # every entry. The result is only serialized to JSON, and decoded
+        # is never changed once the telegram is stored, so sharing it is
+        # safe.
+        return {
+            "timestamp": datetime.fromtimestamp(self.timestamp).isoformat(),
+            "sender_id": self.sender_id,
+            "rorg": self.rorg,
+            "data": self.data,
+            "status": self.status,
+            "dbm": self.dbm,
+            "device_name": self.device_name,
+            "eep_id": self.eep_id,
+            "decoded": self.decoded,
+            "is_teach_in": self.is_teach_in,
+        }
 
 
 class TelegramBuffer:
@@ -36,6 +58,10 @@ class TelegramBuffer:
         self.max_size = max_size
         self._buffer: deque = deque(maxlen=max_size)
         self._unknown_devices: deque = deque(maxlen=50)
+        # The entries of _unknown_devices by sender_id, so a repeat sender is
+        # found without walking the deque. Kept in step with it on append,
+        # eviction and clear.
+        self._unknown_index: Dict[str, Dict[str, Any]] = {}
 
     def add(
         self,
@@ -50,8 +76,9 @@ class TelegramBuffer:
         is_teach_in: bool = False
     ):
         """Add a telegram to the buffer"""
+        now = time.time()
         entry = TelegramEntry(
-            timestamp=datetime.now().isoformat(),
+            timestamp=now,
             sender_id=sender_id,
             rorg=rorg,
             data=data,
@@ -66,26 +93,38 @@ class TelegramBuffer:
 
         # Track unknown devices separately
         if device_name is None:
-            self._add_unknown_device(sender_id, rorg, dbm)
+            self._add_unknown_device(sender_id, rorg, dbm, now)
 
-    def _add_unknown_device(self, sender_id: str, rorg: str, dbm: int):
+    def _add_unknown_device(self, sender_id: str, rorg: str, dbm: int, now: float):
         """Track unknown devices for easy discovery"""
+        # Formatted here, not on read: get_unknown_devices hands these
+        # dicts out as they are. Once, for both fields, from add()'s time.
+        seen = datetime.fromtimestamp(now).isoformat()
+
         # Check if already in list
-        for item in self._unknown_devices:
-            if item["sender_id"] == sender_id:
-                item["last_seen"] = datetime.now().isoformat()
-                item["count"] = item.get("count", 0) + 1
-                item["dbm"] = dbm
-                return
-
-        self._unknown_devices.append({
+        item = self._unknown_index.get(sender_id)
+        if item is not None:
+            item["last_seen"] = seen
+            item["count"] = item.get("count", 0) + 1
+            item["dbm"] = dbm
+            return
+
+        if len(self._unknown_devices) == self._unknown_devices.maxlen:
+            # The deque would drop its oldest entry silently; do it here
+            # so the index forgets it too
+            evicted = self._unknown_devices.popleft()
+            del self._unknown_index[evicted["sender_id"]]
+
+        item = {
             "sender_id": sender_id,
             "rorg": rorg,
-            "first_seen": datetime.now().isoformat(),
-            "last_seen": datetime.now().isoformat(),
+            "first_seen": seen,
+            "last_seen": seen,
             "count": 1,
             "dbm": dbm
-        })
+        }
+        self._unknown_devices.append(item)
+        self._unknown_index[sender_id] = item
 
     def get_recent(self, limit: int = 50) -> List[Dict[str, Any]]:
         """Get most recent telegrams"""
@@ -116,6 +155,7 @@ class TelegramBuffer:
         """Clear the buffer"""
         self._buffer.clear()
         self._unknown_devices.clear()
+        self._unknown_index.clear()
 
     def get_stats(self) -> Dict[str, Any]:
         """Get buffer statistics"""
@@ -0,0 +1,32 @@
+"""
+YAML helpers - one place that decides which PyYAML implementation is used
+
+PyYAML ships a pure-Python parser and, when it was built against libyaml, a C
+one that is roughly ten times faster. Which one exists depends on how pip got
+PyYAML on the add-on's architecture (prebuilt wheel or built from source), so
+the C classes are used when present and the pure-Python ones otherwise. The
+output is the same either way.
+"""
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as _Loader, CSafeDumper as _Dumper
+    LIBYAML = True
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _Loader, SafeDumper as _Dumper
+    LIBYAML = False
+
+
+def safe_load(stream):
+    """Parse YAML from a string, bytes or file object (safe subset only)."""
+    return yaml.load(stream, Loader=_Loader)
+
+
+def dump(data, stream=None):
+    """Serialize to block-style YAML the way every file in /data is written.
+
+    Returns the text when no stream is given, like yaml.dump.
+    """
+    return yaml.dump(data, stream, Dumper=_Dumper,
+                     default_flow_style=False, allow_unicode=True)
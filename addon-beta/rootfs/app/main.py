@@ -11,6 +11,7 @@ import logging
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Optional
+from urllib.parse import parse_qs
 
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
@@ -22,7 +23,7 @@ from api import devices, eep, mappings, system, gateway
 
 # Import core components
 from core.mqtt_handler import MQTTHandler
-from core.serial_handler import SerialHandler
+from core.serial_handler import SerialHandler, parse_enocean_id
 from core.device_manager import DeviceManager
 from core.eep_manager import EEPManager
 from core.mapping_manager import MappingManager
@@ -397,13 +398,8 @@ async def _publish_all_discoveries():
                 device_manager.get_devices_by_address(device.address)
             )
 
-            # Publish each entity discovery config
-            for item in configs:
-                await mqtt_handler.publish_discovery_config(
-                    component=item["component"],
-                    unique_id=item["unique_id"],
-                    config=item["config"]
-                )
+            # Publish all of the device's entity discovery configs at once
+            mqtt_handler.publish_discovery_configs(configs)
 
             # Publish device availability (online)
             await mqtt_handler.publish_device_availability(device.name, available=True)
@@ -502,8 +498,8 @@ async def _handle_device_command(device_name: str, payload: str, entity: str = N
 
     # Parse sender ID to integer
     try:
-        sender_id = int(device.sender_id.replace("0x", "").replace("0X", ""), 16)
-        destination = int(device.address.replace("0x", "").replace("0X", ""), 16)
+        sender_id = parse_enocean_id(device.sender_id)
+        destination = parse_enocean_id(device.address)
     except ValueError as e:
         logger.error(f"Invalid address for {device_name}: {e}")
         return
@@ -511,10 +507,6 @@ async def _handle_device_command(device_name: str, payload: str, entity: str = N
     command = payload.strip().upper()
     logger.info(f"Actuator command: {device_name} ({device.actuator_type}) = {command}")
 
-    # F6 rocker commands use BROADCAST like real EnOcean pushbuttons.
-    # Eltako actuators match by sender ID, not by destination address.
-    broadcast = 0xFFFFFFFF
-
     # --- EEP first, role second -------------------------------------------
     # D2-01-xx modules (NodOn SIN-2-x, in-wall relays/dimmers) are VLD devices
     # and only react to addressed "Actuator Set Output" telegrams. Branch on
@@ -566,34 +558,11 @@ async def _handle_device_command(device_name: str, payload: str, entity: str = N
 
     elif device.actuator_type == "switch":
         # D2-01 switches are handled above (EEP branch). Everything left here
-        # is an Eltako-style actuator driven by simulated F6 rocker presses.
-        if command == "ON":
-            # F6 Rocker BI pressed: data=0x50, status=0x30 (T21+NU)
-            await serial_handler.send_telegram(
-                sender_id=sender_id, rorg=0xF6,
-                data=bytes([0x50]), destination=broadcast, status=0x30
-            )
-            await asyncio.sleep(0.1)
-            # Release: data=0x00, status=0x20 (T21, no NU)
-            await serial_handler.send_telegram(
-                sender_id=sender_id, rorg=0xF6,
-                data=bytes([0x00]), destination=broadcast, status=0x20
-            )
-            logger.info(f"Sent ON (F6 BI press+release) to {device_name}")
-
-        elif command == "OFF":
-            # F6 Rocker BO pressed: data=0x70, status=0x30 (T21+NU)
-            await serial_handler.send_telegram(
-                sender_id=sender_id, rorg=0xF6,
-                data=bytes([0x70]), destination=broadcast, status=0x30
-            )
-            await asyncio.sleep(0.1)
-            # Release: data=0x00, status=0x20 (T21, no NU)
-            await serial_handler.send_telegram(
-                sender_id=sender_id, rorg=0xF6,
-                data=bytes([0x00]), destination=broadcast, status=0x20
-            )
-            logger.info(f"Sent OFF (F6 B0 press+release) to {device_name}")
+        # is an Eltako-style actuator driven by simulated F6 rocker presses:
+        # ON = BI (0x50) press + release, OFF = B0 (0x70) press + release.
+        if command in ("ON", "OFF"):
+            await serial_handler.send_f6_rocker(sender_id, command)
+            logger.info(f"Sent {command} (F6 press+release) to {device_name}")
 
         else:
             logger.warning(f"Unknown command '{command}' for {device_name}")
@@ -630,34 +599,9 @@ async def _handle_device_command(device_name: str, payload: str, entity: str = N
                 logger.warning(f"Unknown cover command '{command}' for {device_name}")
             return
 
-        if command == "OPEN":
-            # BI press+release for open/up
-            await serial_handler.send_telegram(
-                sender_id=sender_id, rorg=0xF6,
-                data=bytes([0x50]), destination=broadcast, status=0x30
-            )
-            await asyncio.sleep(0.1)
-            await serial_handler.send_telegram(
-                sender_id=sender_id, rorg=0xF6,
-                data=bytes([0x00]), destination=broadcast, status=0x20
-            )
-        elif command == "CLOSE":
-            # B0 press+release for close/down
-            await serial_handler.send_telegram(
-                sender_id=sender_id, rorg=0xF6,
-                data=bytes([0x70]), destination=broadcast, status=0x30
-            )
-            await asyncio.sleep(0.1)
-            await serial_handler.send_telegram(
-                sender_id=sender_id, rorg=0xF6,
-                data=bytes([0x00]), destination=broadcast, status=0x20
-            )
-        elif command == "STOP":
-            # Any release without prior press = stop
-            await serial_handler.send_telegram(
-                sender_id=sender_id, rorg=0xF6,
-                data=bytes([0x00]), destination=broadcast, status=0x20
-            )
+        # OPEN = BI press + release, CLOSE = B0, STOP = release only
+        if command in ("OPEN", "CLOSE", "STOP"):
+            await serial_handler.send_f6_rocker(sender_id, command)
 
 
 # Create FastAPI app
@@ -668,11 +612,39 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+class VersionedStaticFiles(StaticFiles):
+    """StaticFiles that lets the browser keep versioned assets.
+
+    index.html requests every script, stylesheet and i18n file with
+    ?v=<add-on version>, and that URL changes exactly when the files do, so
+    a versioned response can be cached for good: reloading the UI through
+    ingress then costs no static requests at all, where it used to
+    revalidate every file. Only the running version counts: a request
+    without ?v= (someone typing the URL) or with another version's (a page
+    still open from before an update) gets no-cache and keeps the ETag/304
+    revalidation StaticFiles does, so nothing but the current files is
+    pinned in the browser.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if query.get("v") == [VERSION]:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
+
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", VersionedStaticFiles(directory="static"), name="static")
 
 # Templates
 templates = Jinja2Templates(directory="templates")
+# The add-on version is the page's only input and cannot change while the
+# process runs, so the page is rendered once here instead of on every load
+# (about 60 us of Jinja per request, mostly re-encoding 55 KB of output).
+_INDEX_HTML = templates.get_template("index.html").render(version=VERSION).encode("utf-8")
 
 # Include API routers
 app.include_router(devices.router, prefix="/api/devices", tags=["devices"])
@@ -685,10 +657,7 @@ app.include_router(gateway.router, prefix="/api/gateway", tags=["gateway"])
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
     """Serve the main UI"""
-    return templates.TemplateResponse("index.html", {
-        "request": request,
-        "version": VERSION
-    })
+    return HTMLResponse(_INDEX_HTML)
 
 
 @app.get("/health")
@@ -708,10 +677,18 @@ if __name__ == "__main__":
     # Suppress uvicorn's own startup messages ("Uvicorn running on http://0.0.0.0:8099",
     # "Application startup complete") which confuse users.
     # Our own "started successfully" message in the lifespan is clearer.
+    # The event loop is left at uvicorn's default (loop="auto"): that is
+    # uvloop, which uvicorn[standard] installs, with asyncio's own loop as the
+    # fallback should uvloop ever fail to install (ADR-0012). The same goes
+    # for http="auto", which picks httptools' C parser over h11.
+    # log_level="warning" already drops uvicorn.access's INFO lines, so the
+    # access log is switched off outright: otherwise every request still
+    # builds the client address and path for a record that is thrown away.
     uvicorn.run(
         app,
         host="0.0.0.0",
         port=8099,
         log_level="warning",
-        log_config=None
+        log_config=None,
+        access_log=False
     )